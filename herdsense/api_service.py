@@ -0,0 +1,571 @@
+"""Local asyncio HTTP service over the HerdSense engines (stdlib only).
+
+Keeps each farm's store snapshot, per-day signal views and herd index warm in
+memory and caches computed responses per (farm, endpoint, day). Writes made
+through the service invalidate only the affected days; external writes to a
+JSON store are picked up on the next request via `DataStore.snapshot()`.
+Batch insight scoring runs in a process pool so the event loop stays free.
+
+    python api_service.py --farm default=farm.json --port 8080
+
+GET  /health
+GET  /farms/{farm}/insights?day=YYYY-MM-DD
+GET  /farms/{farm}/congestion?day=
+GET  /farms/{farm}/roi?day=
+GET  /farms/{farm}/money-report?day=
+GET  /farms/{farm}/stations?day=
+GET  /farms/{farm}/feed-forecast?day=          (needs NumPy)
+GET  /farms/{farm}/calendar
+POST /farms/{farm}/cows                       body: cow
+POST /farms/{farm}/logs                       body: [{"ear_tag_id": ..., "log": {...}}, ...]
+POST /farms/{farm}/calendar/{occurrence_id}/done|skip
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+import json
+import multiprocessing
+import os
+
+from calendar_engine import mark_done, mark_skipped
+from data_store import LOG_RETENTION_DAYS, DataStore
+from herd_index import HerdIndex
+from insights_engine import score_insights
+from money_report import compute_money_leaks, compute_weekly_feed_spend, compute_weekly_milk_revenue
+from optimization_engine import congestion_summary, feed_rows, recommendation_set, roi_summary
+from signal_sanitizer import sanitize_history
+
+
+BASELINE_DAYS = 14
+SCORE_CHUNK = 256
+
+# Views and responses are kept per requested day; the oldest entries are
+# dropped beyond these so arbitrary ?day= values cannot grow memory.
+MAX_CACHED_VIEWS = 32
+MAX_CACHED_RESPONSES = 512
+
+BASELINE_METRICS = [
+    "trough_minutes_today",
+    "meals_count_today",
+    "activity_index_today",
+    "alone_minutes_today",
+    "water_visits_today",
+]
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error", 501: "Not Implemented"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _score_chunk(items: List[Tuple[Dict, Dict, Dict]]) -> List[Dict]:
+    out = []
+    for cow, today, baseline in items:
+        result = score_insights(cow, today, baseline)
+        out.append({"cow_id": cow.get("cow_id"), "ear_tag_id": cow.get("ear_tag_id"), **asdict(result)})
+    return out
+
+
+def _bounded_put(cache: Dict, key: Any, value: Any, limit: int) -> Any:
+    while len(cache) >= limit:
+        del cache[next(iter(cache))]
+    cache[key] = value
+    return value
+
+
+def _with_cow(payload: Dict, cow: Dict) -> Dict:
+    cows = list(payload.get("cows", []))
+    pos = next((i for i, c in enumerate(cows) if c.get("cow_id") == cow.get("cow_id")), None)
+    if pos is None:
+        cows.append(cow)
+    else:
+        cows[pos] = cow
+    return {**payload, "cows": cows}
+
+
+def _with_logs(payload: Dict, pairs: List[Tuple[str, Dict]]) -> Dict:
+    # Mirrors SqliteDataStore: a log replaces the same (tag, date) row.
+    logs = dict(payload.get("daily_logs_by_ear_tag", {}))
+    for tag, log in pairs:
+        key = tag.strip().upper()
+        rows = [r for r in logs.get(key, []) if not log.get("date") or r.get("date") != log.get("date")]
+        rows.append(log)
+        logs[key] = rows[-LOG_RETENTION_DAYS:]
+    return {**payload, "daily_logs_by_ear_tag": logs}
+
+
+def _roi_rows(cows: List[Dict], view: "DayView", settings: Dict) -> Tuple[List[Dict], Dict, Dict]:
+    rows = feed_rows(cows, view.today_by_tag, float(settings.get("feed_cost_per_kg", 0.0)))
+    congestion = congestion_summary(cows, view.today_by_tag)
+    return rows, roi_summary(rows, settings), congestion
+
+
+@dataclass
+class DayView:
+    today_by_tag: Dict[str, Dict]
+    baseline_by_tag: Dict[str, Dict]
+    history_by_tag: Dict[str, List[Dict]]
+
+
+def _rows_upto(rows: List[Dict], day: str) -> List[Dict]:
+    # DataStore appends a second row when a date is re-posted; the last one
+    # wins, as with SqliteDataStore's (tag, date) replace and `_with_logs`.
+    undated: List[Dict] = []
+    by_date: Dict[str, Dict] = {}
+    for row in rows:
+        key = row.get("date")
+        if not key:
+            undated.append(row)
+        elif key <= day:
+            by_date.pop(key, None)
+            by_date[key] = row
+    return undated + list(by_date.values())
+
+
+def build_day_view(payload: Dict, day: str, baseline_days: int = BASELINE_DAYS) -> DayView:
+    # The whole herd history is sanitized in one bulk pass here, so the
+    # per-cow engine calls downstream work on clean values.
+    history, _ = sanitize_history(
+        {tag: _rows_upto(rows, day) for tag, rows in payload.get("daily_logs_by_ear_tag", {}).items()}
+    )
+    today_by_tag: Dict[str, Dict] = {}
+    baseline_by_tag: Dict[str, Dict] = {}
+    history_by_tag: Dict[str, List[Dict]] = {}
+    for tag, upto in history.items():
+        if not upto:
+            continue
+        history_by_tag[tag] = upto
+        if upto[-1].get("date") == day:
+            today_by_tag[tag] = upto[-1]
+        prior = upto[:-1][-baseline_days:] if upto[-1].get("date") == day else upto[-baseline_days:]
+        baseline = {}
+        for metric in BASELINE_METRICS:
+            values = [float(r[metric]) for r in prior if r.get(metric) is not None]
+            if values:
+                baseline[metric] = sum(values) / len(values)
+        baseline_by_tag[tag] = baseline
+    return DayView(today_by_tag, baseline_by_tag, history_by_tag)
+
+
+@dataclass
+class FarmState:
+    store: Any
+    settings: Dict[str, Any] = field(default_factory=dict)
+    payload: Optional[Dict] = None
+    source: Any = None
+    herd_index: Optional[HerdIndex] = None
+    index_build: Optional["asyncio.Future[HerdIndex]"] = None
+    views: Dict[str, DayView] = field(default_factory=dict)
+    view_builds: Dict[str, Tuple[Dict, "asyncio.Future[DayView]"]] = field(default_factory=dict)
+    cache: Dict[Tuple, bytes] = field(default_factory=dict)
+    inflight: Dict[Tuple, "asyncio.Future[bytes]"] = field(default_factory=dict)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    async def refresh(self) -> None:
+        # snapshot() re-parses the whole file after an external write, so it
+        # runs in a thread like every other full-farm read.
+        async with self.lock:
+            snapshot = getattr(self.store, "snapshot", None)
+            if snapshot is not None:
+                current = await asyncio.to_thread(snapshot)
+                if current is not self.source:
+                    self.source = current
+                    self.reset(current)
+            elif self.payload is None:
+                self.reset(await asyncio.to_thread(self.store.load))
+
+    def reset(self, payload: Dict) -> None:
+        self.payload = payload
+        self.herd_index = None
+        self.index_build = None
+        self.views.clear()
+        self.view_builds.clear()
+        self.cache.clear()
+
+    def invalidate_from(self, day: str) -> None:
+        for key in [k for k in self.views if k >= day]:
+            del self.views[key]
+        for key in [k for k in self.cache if k[1] is None or k[1] >= day]:
+            del self.cache[key]
+
+    def invalidate_route(self, route: str) -> None:
+        for key in [k for k in self.cache if k[0] == route]:
+            del self.cache[key]
+
+    @property
+    def merged_settings(self) -> Dict[str, Any]:
+        return {**(self.payload or {}).get("settings", {}), **self.settings}
+
+    def latest_day(self) -> str:
+        days = [rows[-1].get("date") or "" for rows in self.payload.get("daily_logs_by_ear_tag", {}).values() if rows]
+        return max(days) if days else datetime.utcnow().date().isoformat()
+
+    async def view(self, day: str) -> DayView:
+        # Built in a thread and shared by concurrent requests for the day; a
+        # view of a payload that was replaced meanwhile is returned, not kept.
+        view = self.views.get(day)
+        if view is not None:
+            return view
+        entry = self.view_builds.get(day)
+        if entry is None or entry[0] is not self.payload:
+            build = asyncio.ensure_future(asyncio.to_thread(build_day_view, self.payload, day))
+            entry = self.view_builds[day] = (self.payload, build)
+        payload, build = entry
+        try:
+            view = await asyncio.shield(build)
+        finally:
+            if self.view_builds.get(day) is entry:
+                del self.view_builds[day]
+        if self.payload is payload:
+            _bounded_put(self.views, day, view, MAX_CACHED_VIEWS)
+        return view
+
+    async def index(self) -> HerdIndex:
+        # Building is CPU-bound (seconds on large herds), so it runs in a thread
+        # and concurrent requests share one build. A write that lands meanwhile
+        # drops `index_build`, so the stale result is not kept.
+        if self.herd_index is not None:
+            return self.herd_index
+        if self.index_build is None:
+            self.index_build = asyncio.ensure_future(
+                asyncio.to_thread(HerdIndex.from_payload, self.payload, self.merged_settings)
+            )
+        build = self.index_build
+        index = await asyncio.shield(build)
+        if self.index_build is build:
+            self.index_build = None
+            self.herd_index = index
+        return index
+
+    def active_cows(self) -> List[Dict]:
+        return [c for c in self.payload.get("cows", []) if c.get("is_active", True)]
+
+
+class HerdService:
+    def __init__(
+        self,
+        farms: Dict[str, Any],
+        settings: Optional[Dict[str, Dict]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        settings = settings or {}
+        self.farms = {name: FarmState(store, settings.get(name, {})) for name, store in farms.items()}
+        # spawn, not fork: workers start lazily from a process that already runs
+        # the event loop and executor threads, which fork does not handle safely.
+        self.executor = executor or ProcessPoolExecutor(
+            max_workers=max(1, (os.cpu_count() or 2) - 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.routes: List[Tuple[str, str, Callable[..., Awaitable[Any]]]] = [
+            ("GET", "insights", self.insights),
+            ("GET", "congestion", self.congestion),
+            ("GET", "roi", self.roi),
+            ("GET", "money-report", self.money_report),
+            ("GET", "stations", self.stations),
+            ("GET", "feed-forecast", self.feed_forecast),
+            ("GET", "calendar", self.calendar),
+            ("POST", "cows", self.post_cow),
+            ("POST", "logs", self.post_logs),
+            ("POST", "calendar", self.post_calendar),
+        ]
+
+    # Dispatch
+
+    async def handle(self, method: str, target: str, body: bytes) -> Tuple[int, bytes]:
+        parts = urlsplit(target)
+        path = [unquote(p) for p in parts.path.strip("/").split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+
+        if path == ["health"]:
+            return 200, b'{"ok": true}'
+        if len(path) < 3 or path[0] != "farms":
+            raise HttpError(404, "unknown path")
+        farm = self.farms.get(path[1])
+        if farm is None:
+            raise HttpError(404, f"unknown farm {path[1]}")
+
+        for route_method, name, handler in self.routes:
+            if name == path[2]:
+                if route_method != method:
+                    continue
+                await farm.refresh()
+                if method == "GET":
+                    day = query.get("day") or farm.latest_day()
+                    try:
+                        day = date.fromisoformat(day).isoformat()
+                    except ValueError as exc:
+                        raise HttpError(400, "day must be YYYY-MM-DD") from exc
+                    return 200, await self._cached(farm, name, day, lambda: handler(farm, day))
+                payload = json.loads(body or b"null")
+                return 200, _encode(await handler(farm, path[3:], payload))
+        raise HttpError(405 if any(n == path[2] for _, n, _ in self.routes) else 404, "no such endpoint")
+
+    async def _cached(self, farm: FarmState, route: str, day: str, compute: Callable[[], Awaitable[Any]]) -> bytes:
+        key = (route, None if route == "calendar" else day)
+        body = farm.cache.get(key)
+        if body is not None:
+            return body
+        pending = farm.inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+        farm.inflight[key] = future
+        source = farm.payload
+        try:
+            body = _encode(await compute())
+            if farm.payload is source:
+                _bounded_put(farm.cache, key, body, MAX_CACHED_RESPONSES)
+            future.set_result(body)
+            return body
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        finally:
+            farm.inflight.pop(key, None)
+
+    # Read endpoints
+
+    async def insights(self, farm: FarmState, day: str) -> Dict:
+        view = await farm.view(day)
+        items = []
+        for cow in farm.active_cows():
+            tag = (cow.get("ear_tag_id") or "").strip().upper()
+            if tag in view.today_by_tag:
+                items.append((cow, view.today_by_tag[tag], view.baseline_by_tag.get(tag, {})))
+        loop = asyncio.get_running_loop()
+        chunks = [items[i : i + SCORE_CHUNK] for i in range(0, len(items), SCORE_CHUNK)]
+        results = await asyncio.gather(*(loop.run_in_executor(self.executor, _score_chunk, chunk) for chunk in chunks))
+        return {"day": day, "cows": [row for chunk in results for row in chunk]}
+
+    async def congestion(self, farm: FarmState, day: str) -> Dict:
+        view = await farm.view(day)
+        return {"day": day, **await asyncio.to_thread(congestion_summary, farm.active_cows(), view.today_by_tag)}
+
+    async def _roi(self, farm: FarmState, day: str) -> Tuple[List[Dict], Dict, Dict]:
+        view = await farm.view(day)
+        return await asyncio.to_thread(_roi_rows, farm.active_cows(), view, farm.merged_settings)
+
+    async def roi(self, farm: FarmState, day: str) -> Dict:
+        rows, roi, congestion = await self._roi(farm, day)
+        return {
+            "day": day,
+            "rows": rows,
+            "roi": roi,
+            "recommendations": [asdict(r) for r in recommendation_set(rows, roi, congestion)],
+        }
+
+    async def money_report(self, farm: FarmState, day: str) -> Dict:
+        view = await farm.view(day)
+        settings = farm.merged_settings
+        feed = await asyncio.to_thread(
+            compute_weekly_feed_spend, view.history_by_tag, float(settings.get("feed_cost_per_kg", 0.0))
+        )
+        milk = await asyncio.to_thread(compute_weekly_milk_revenue, view.history_by_tag, settings.get("milk_price_per_liter"))
+
+        rows, _, congestion = await self._roi(farm, day)
+        level = "high" if congestion["score"] >= 0.45 else "medium" if congestion["score"] >= 0.25 else "low"
+        heat = sum(
+            1
+            for s in view.today_by_tag.values()
+            if (s.get("temp_c_today") or 0) >= 30 and (s.get("humidity_pct_today") or 0) >= 65
+        )
+        ranked = sorted((r for r in rows if r.get("cost_per_liter") is not None), key=lambda r: r["cost_per_liter"], reverse=True)
+        leaks = compute_money_leaks(
+            feed["feed_spend_week"],
+            level,
+            heat,
+            underperformer_name=ranked[0]["ear_tag_id"] if ranked else None,
+            station_alerts=(await farm.index()).anomalous_stations(day),
+        )
+        return {"day": day, **feed, **milk, "leaks": leaks}
+
+    async def stations(self, farm: FarmState, day: str) -> Dict:
+        return {"day": day, "anomalous": (await farm.index()).anomalous_stations(day)}
+
+    async def feed_forecast(self, farm: FarmState, day: str) -> Dict:
+        try:
+            from feed_forecast import forecast_feed
+        except ImportError as exc:
+            raise HttpError(501, "feed forecasting requires numpy") from exc
+
+        view = await farm.view(day)
+        tags = [c.get("ear_tag_id", "") for c in farm.active_cows()]
+        # Fixed seed keeps cached responses reproducible for the same data.
+        result = await asyncio.to_thread(forecast_feed, view.history_by_tag, farm.merged_settings, tags, seed=0)
+        return {"day": day, **result}
+
+    async def calendar(self, farm: FarmState, day: str) -> Dict:
+        return {
+            "task_occurrences": farm.payload.get("task_occurrences", []),
+            "task_history": farm.payload.get("task_history", []),
+        }
+
+    # Write endpoints
+
+    async def _write(
+        self,
+        farm: FarmState,
+        fn: Callable[[], Any],
+        local: Optional[Callable[[Dict, Any], Dict]] = None,
+    ) -> Any:
+        # JSON stores are re-read through their snapshot cache. Mutators only
+        # return what they touched, so for other stores `local` applies the same
+        # change to a copy of the in-memory payload instead of reloading it.
+        async with farm.lock:
+            result = await asyncio.to_thread(fn)
+            if hasattr(farm.store, "snapshot"):
+                farm.payload = farm.source = await asyncio.to_thread(farm.store.snapshot)
+            elif local is not None and farm.payload is not None:
+                farm.payload = local(farm.payload, result)
+            else:
+                farm.payload = await asyncio.to_thread(farm.store.load)
+        return result
+
+    async def post_cow(self, farm: FarmState, rest: List[str], body: Any) -> Dict:
+        if not isinstance(body, dict):
+            raise HttpError(400, "expected a cow object")
+        try:
+            await self._write(farm, lambda: farm.store.upsert_cow(body), _with_cow)
+        except ValueError as exc:
+            raise HttpError(409, str(exc)) from exc
+        farm.reset(farm.payload)
+        return {"ok": True}
+
+    async def post_logs(self, farm: FarmState, rest: List[str], body: Any) -> Dict:
+        entries = body if isinstance(body, list) else [body]
+        try:
+            pairs = [(e["ear_tag_id"], e["log"]) for e in entries]
+        except (KeyError, TypeError) as exc:
+            raise HttpError(400, "expected [{ear_tag_id, log}]") from exc
+        for tag, log in pairs:
+            if not isinstance(tag, str) or not tag.strip():
+                raise HttpError(400, "ear_tag_id must be a non-empty string")
+            if not isinstance(log, dict) or not isinstance(log.get("date"), str) or not log["date"]:
+                raise HttpError(400, "each log must be an object with a date")
+        await self._write(farm, lambda: farm.store.append_daily_logs(pairs), lambda payload, _: _with_logs(payload, pairs))
+
+        days = [log.get("date") or "" for _, log in pairs]
+        farm.invalidate_from(min(days) if days else "")
+        farm.index_build = None
+        if farm.herd_index is not None:
+            farm.herd_index.add_logs(pairs)
+        return {"ok": True, "written": len(pairs)}
+
+    async def post_calendar(self, farm: FarmState, rest: List[str], body: Any) -> Dict:
+        if len(rest) != 2 or rest[1] not in {"done", "skip"}:
+            raise HttpError(404, "expected /calendar/{occurrence_id}/done|skip")
+        occurrence_id, action = rest
+        op = mark_done if action == "done" else mark_skipped
+
+        def apply(occurrences: List[Dict], history: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+            return op(occurrences, history, occurrence_id)
+
+        def with_tasks(payload: Dict, tasks: Tuple[List[Dict], List[Dict]]) -> Dict:
+            return {**payload, "task_occurrences": tasks[0], "task_history": tasks[1]}
+
+        await self._write(farm, lambda: farm.store.update_tasks(apply), with_tasks)
+        farm.invalidate_route("calendar")
+        return {"ok": True}
+
+    # HTTP plumbing
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0") or 0))
+
+                try:
+                    status, payload = await self.handle(method.upper(), target, body)
+                except HttpError as exc:
+                    status, payload = exc.status, _encode({"error": str(exc)})
+                except ValueError as exc:
+                    status, payload = 400, _encode({"error": str(exc)})
+                except Exception as exc:  # keep serving other clients
+                    status, payload = 500, _encode({"error": repr(exc)})
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(payload)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode("latin-1")
+                    + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._client, host, port)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _encode(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), default=str).encode()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    farms = {}
+    for spec in args.farm:
+        name, _, path = spec.partition("=")
+        farms[name] = DataStore(Path(path))
+    executor = ThreadPoolExecutor() if args.threads else None
+    service = HerdService(farms, executor=executor)
+    server = await service.start(args.host, args.port)
+    print(f"HerdSense API on http://{args.host}:{args.port} farms={sorted(farms)}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local HerdSense API service")
+    parser.add_argument("--farm", action="append", default=[], help="name=path/to/store.json (repeatable)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--threads", action="store_true", help="score in a thread pool instead of processes")
+    args = parser.parse_args()
+    if not args.farm:
+        parser.error("at least one --farm name=path is required")
+    asyncio.run(_serve(args))
+
+
+if __name__ == "__main__":
+    main()
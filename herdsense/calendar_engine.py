@@ -5,6 +5,8 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
 
+from records import updated as copy_record
+
 
 def _as_date(value: str | datetime) -> datetime:
     if isinstance(value, datetime):
@@ -47,7 +49,7 @@ def mark_done(
             updated.append(occ)
             continue
 
-        done = {**occ, "status": "done", "completed_at": now.isoformat()}
+        done = copy_record(occ, status="done", completed_at=now.isoformat())
         updated.append(done)
 
         recurrence = occ.get("recurrence")
@@ -56,14 +58,14 @@ def mark_done(
             next_due = add_interval(due, recurrence).date().isoformat()
             key = f"{occ.get('template_id', 'custom')}|{next_due}"
             if key not in existing_keys:
-                clone = {
-                    **occ,
-                    "occurrence_id": f"occ-{occ.get('template_id', 'custom')}-{next_due}-{abs(hash((occurrence_id, next_due)))}",
-                    "due_date": next_due,
-                    "status": "pending",
-                    "completed_at": None,
-                    "created_at": now.isoformat(),
-                }
+                clone = copy_record(
+                    occ,
+                    occurrence_id=f"occ-{occ.get('template_id', 'custom')}-{next_due}-{abs(hash((occurrence_id, next_due)))}",
+                    due_date=next_due,
+                    status="pending",
+                    completed_at=None,
+                    created_at=now.isoformat(),
+                )
                 next_occurrences.append(clone)
                 existing_keys.add(key)
 
@@ -85,7 +87,7 @@ def mark_skipped(
 ) -> Tuple[List[Dict], List[Dict]]:
     now = now or datetime.utcnow()
     updated = [
-        {**occ, "status": "skipped", "completed_at": now.isoformat()} if occ.get("occurrence_id") == occurrence_id else occ
+        copy_record(occ, status="skipped", completed_at=now.isoformat()) if occ.get("occurrence_id") == occurrence_id else occ
         for occ in task_occurrences
     ]
     history_entry = {
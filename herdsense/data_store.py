@@ -1,78 +1,256 @@
-"""Simple JSON data store for cows, tasks, and daily logs."""
+"""Simple JSON data store for cows, tasks, and daily logs.
+
+Safe to share between processes: writes are atomic (temp file + rename) so
+readers always see a complete snapshot without locking, and mutations are
+applied optimistically and committed under an inter-process file lock only if
+no other writer got in first (otherwise they are re-applied to the newer data).
+
+Mutators return only what they touched (the stored cow, the new task lists or
+None), the same as `sqlite_store.SqliteDataStore`; use `load()`/`snapshot()`
+or `mutate()` when the whole payload is needed.
+"""
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections.abc import Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import json
+import os
+import re
+import secrets
+import stat
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from records import as_dict
+
+
+LOG_RETENTION_DAYS = 120
+
+REVISION_KEY = "_revision"
+_REVISION_HEAD = re.compile(rb'\A\{\s*"_revision":\s*(\d+)')
+
+TaskUpdate = Callable[[List[Dict[str, Any]], List[Dict[str, Any]]], Tuple[List[Any], List[Any]]]
+
+
+def _empty_payload() -> Dict[str, Any]:
+    return {
+        "cows": [],
+        "task_occurrences": [],
+        "task_history": [],
+        "daily_logs_by_ear_tag": {},
+    }
+
+
+def _json_default(obj: Any) -> Any:
+    # Cow/TaskOccurrence/DaySignal records are Mappings but not dicts.
+    if isinstance(obj, Mapping):
+        return as_dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+@contextmanager
+def _file_lock(lock_path: Path) -> Iterator[Any]:
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield handle
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ConflictError(RuntimeError):
+    pass
 
 
 @dataclass
 class DataStore:
     path: Path
+    max_retries: int = 5
+    _snapshot: Optional[Tuple[Tuple[int, int, int], Dict[str, Any]]] = field(default=None, init=False, repr=False)
+
+    @property
+    def lock_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".lock")
+
+    def _read(self) -> Tuple[Dict[str, Any], int]:
+        try:
+            with open(self.path) as handle:
+                payload = json.load(handle)
+        except FileNotFoundError:
+            return _empty_payload(), 0
+        return payload, int(payload.pop(REVISION_KEY, 0))
+
+    def _write(self, payload: Dict[str, Any], revision: int) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Unlike mkstemp (always 0600), 0o666 here is filtered by the umask like
+        # any new file; rewrites then copy the existing file's mode.
+        tmp = self.path.with_name(f".{self.path.name}.{secrets.token_hex(6)}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with os.fdopen(fd, "w") as handle:
+                json.dump({**payload, REVISION_KEY: revision}, handle, indent=2, sort_keys=True, default=_json_default)
+            try:
+                os.chmod(tmp, stat.S_IMODE(os.stat(self.path).st_mode))
+            except FileNotFoundError:
+                pass
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _committed_revision(self) -> int:
+        # sort_keys puts "_revision" first in files written here, so the commit
+        # check only reads the head of the data file instead of parsing it all.
+        try:
+            with open(self.path, "rb") as handle:
+                match = _REVISION_HEAD.match(handle.read(64))
+        except FileNotFoundError:
+            return 0
+        return int(match.group(1)) if match else self._read()[1]
+
+    def revision(self) -> int:
+        return self._committed_revision()
 
     def load(self) -> Dict[str, Any]:
-        if not self.path.exists():
-            return {
-                "cows": [],
-                "task_occurrences": [],
-                "task_history": [],
-                "daily_logs_by_ear_tag": {},
-            }
-        return json.loads(self.path.read_text())
+        return self._read()[0]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Shared read-only view, re-parsed only when the file changes. Do not mutate."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return _empty_payload()
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if self._snapshot is None or self._snapshot[0] != key:
+            self._snapshot = (key, self.load())
+        return self._snapshot[1]
 
     def save(self, payload: Dict[str, Any]) -> None:
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        self.path.write_text(json.dumps(payload, indent=2, sort_keys=True))
+        with _file_lock(self.lock_path):
+            self._write(payload, self._committed_revision() + 1)
 
-    def upsert_cow(self, cow: Dict[str, Any]) -> Dict[str, Any]:
-        payload = self.load()
-        cows: List[Dict[str, Any]] = payload.get("cows", [])
+    def mutate(self, fn: Callable[[Dict[str, Any]], None], expected_revision: Optional[int] = None) -> Dict[str, Any]:
+        """Apply `fn` to a fresh payload and commit it.
+
+        `fn` runs outside the lock; the commit only happens if nobody else has
+        written since the payload was read, otherwise `fn` is re-applied to the
+        newer data. After `max_retries` conflicts the mutation runs under the
+        lock. With `expected_revision`, a stale caller gets ConflictError instead.
+        """
+        for _ in range(max(0, self.max_retries)):
+            payload, revision = self._read()
+            if expected_revision is not None and revision != expected_revision:
+                raise ConflictError(f"{self.path} is at revision {revision}, expected {expected_revision}")
+            fn(payload)
+            with _file_lock(self.lock_path):
+                if self._committed_revision() == revision:
+                    self._write(payload, revision + 1)
+                    return payload
+            if expected_revision is not None:
+                raise ConflictError(f"{self.path} changed during update")
+
+        with _file_lock(self.lock_path):
+            payload, revision = self._read()
+            if expected_revision is not None and revision != expected_revision:
+                raise ConflictError(f"{self.path} is at revision {revision}, expected {expected_revision}")
+            fn(payload)
+            self._write(payload, revision + 1)
+            return payload
 
+    def upsert_cow(self, cow: Dict[str, Any]) -> Dict[str, Any]:
+        cow = as_dict(cow)
         ear = (cow.get("ear_tag_id") or "").strip().upper()
         if not ear:
             raise ValueError("ear_tag_id is required")
+        stored: List[Dict[str, Any]] = []
 
-        duplicate = next((c for c in cows if c.get("ear_tag_id", "").upper() == ear and c.get("cow_id") != cow.get("cow_id")), None)
-        if duplicate:
-            raise ValueError(f"Duplicate ear_tag_id: {ear}")
+        def apply(payload: Dict[str, Any]) -> None:
+            cows: List[Dict[str, Any]] = payload.get("cows", [])
 
-        existing_idx = next((i for i, c in enumerate(cows) if c.get("cow_id") == cow.get("cow_id")), None)
-        if existing_idx is None:
-            cows.append(cow)
-        else:
-            cows[existing_idx] = {**cows[existing_idx], **cow}
-
-        payload["cows"] = cows
-        self.save(payload)
-        return payload
-
-    def delete_cow(self, cow_id: str) -> Dict[str, Any]:
-        payload = self.load()
-        cows = payload.get("cows", [])
-        payload["cows"] = [cow for cow in cows if cow.get("cow_id") != cow_id]
-        self.save(payload)
-        return payload
-
-    def archive_cow(self, cow_id: str, inactive: bool = True) -> Dict[str, Any]:
-        payload = self.load()
-        next_cows = []
-        for cow in payload.get("cows", []):
-            if cow.get("cow_id") == cow_id:
-                next_cows.append({**cow, "is_active": not inactive})
+            duplicate = next((c for c in cows if c.get("ear_tag_id", "").upper() == ear and c.get("cow_id") != cow.get("cow_id")), None)
+            if duplicate:
+                raise ValueError(f"Duplicate ear_tag_id: {ear}")
+
+            existing_idx = next((i for i, c in enumerate(cows) if c.get("cow_id") == cow.get("cow_id")), None)
+            if existing_idx is None:
+                cows.append(cow)
             else:
-                next_cows.append(cow)
-        payload["cows"] = next_cows
-        self.save(payload)
-        return payload
-
-    def append_daily_log(self, ear_tag_id: str, day_log: Dict[str, Any]) -> Dict[str, Any]:
-        payload = self.load()
-        key = ear_tag_id.strip().upper()
-        logs = payload.setdefault("daily_logs_by_ear_tag", {})
-        rows = logs.get(key, [])
-        rows.append(day_log)
-        logs[key] = rows[-120:]
-        self.save(payload)
-        return payload
+                cows[existing_idx] = {**cows[existing_idx], **cow}
+            stored[:] = [cows[-1] if existing_idx is None else cows[existing_idx]]
+
+            payload["cows"] = cows
+
+        self.mutate(apply)
+        return stored[0]
+
+    def delete_cow(self, cow_id: str) -> None:
+        def apply(payload: Dict[str, Any]) -> None:
+            cows = payload.get("cows", [])
+            payload["cows"] = [cow for cow in cows if cow.get("cow_id") != cow_id]
+
+        self.mutate(apply)
+
+    def archive_cow(self, cow_id: str, inactive: bool = True) -> Optional[Dict[str, Any]]:
+        stored: List[Optional[Dict[str, Any]]] = [None]
+
+        def apply(payload: Dict[str, Any]) -> None:
+            next_cows = []
+            stored[0] = None
+            for cow in payload.get("cows", []):
+                if cow.get("cow_id") == cow_id:
+                    stored[0] = {**cow, "is_active": not inactive}
+                    next_cows.append(stored[0])
+                else:
+                    next_cows.append(cow)
+            payload["cows"] = next_cows
+
+        self.mutate(apply)
+        return stored[0]
+
+    def append_daily_log(self, ear_tag_id: str, day_log: Dict[str, Any]) -> None:
+        self.append_daily_logs([(ear_tag_id, day_log)])
+
+    def append_daily_logs(self, entries: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        entries = [(ear_tag_id.strip().upper(), as_dict(day_log)) for ear_tag_id, day_log in entries]
+
+        def apply(payload: Dict[str, Any]) -> None:
+            logs = payload.setdefault("daily_logs_by_ear_tag", {})
+            touched = set()
+            for key, day_log in entries:
+                logs.setdefault(key, []).append(day_log)
+                touched.add(key)
+            for key in touched:
+                logs[key] = logs[key][-LOG_RETENTION_DAYS:]
+
+        self.mutate(apply)
+
+    def update_tasks(self, fn: TaskUpdate) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Replace task occurrences and history with `fn(occurrences, history)`."""
+        result: List[Tuple[List[Any], List[Any]]] = []
+
+        def apply(payload: Dict[str, Any]) -> None:
+            result[:] = [fn(payload.get("task_occurrences", []), payload.get("task_history", []))]
+            payload["task_occurrences"], payload["task_history"] = result[0]
+
+        self.mutate(apply)
+        return result[0]
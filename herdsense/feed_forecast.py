@@ -0,0 +1,243 @@
+"""Monte Carlo feed inventory and cost forecasting (requires NumPy).
+
+`roi_summary` divides inventory by a single day's burn. Here the herd's daily
+feed is modelled from the logs instead:
+
+    herd_kg[t] = base * dow[weekday(t)] * heat[t] * exp(shock[t]) + noise[t]
+
+where `dow` and `heat` are multiplicative effects fitted on per-cow daily
+averages, `base` is the sum of each active cow's recent mean with those effects
+divided out (so a window heavy in hot days is not counted hot twice), and
+heat days are drawn at the window's observed frequency unless a probability
+is passed in. `shock` is an AR(1) herd-wide deviation (weather, ration
+changes) and `noise` the summed per-cow day-to-day variance. Thousands of
+paths are simulated in one batched array to get percentile bands for
+stock-out date and monthly cost.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from optimization_engine import estimate_feed_kg
+
+
+PERCENTILES = (10, 50, 90)
+
+
+def _is_heat_day(signal: Dict) -> bool:
+    temp = signal.get("temp_c_today")
+    humidity = signal.get("humidity_pct_today")
+    return temp is not None and humidity is not None and temp >= 30 and humidity >= 65
+
+
+@dataclass
+class FeedModel:
+    base_kg_day: float
+    idio_sd_kg: float
+    dow_factors: List[float]
+    heat_factor: float
+    heat_day_frequency: float
+    shock_sd: float
+    shock_ar1: float
+    last_date: Optional[date]
+    cows: int
+    days_observed: int
+
+
+def fit_feed_model(
+    history_by_tag: Dict[str, List[Dict]],
+    active_tags: Optional[Iterable[str]] = None,
+    window_days: int = 28,
+) -> FeedModel:
+    tags = set(history_by_tag) if active_tags is None else {t.strip().upper() for t in active_tags}
+
+    by_date: Dict[str, List[float]] = {}
+    heat_votes: Dict[str, List[int]] = {}
+    per_cow_days: List[Tuple[List[Optional[str]], np.ndarray]] = []
+    for tag, series in history_by_tag.items():
+        if tag.strip().upper() not in tags or not series:
+            continue
+        recent = series[-window_days:]
+        kg = np.array([estimate_feed_kg(day) for day in recent], dtype=float)
+        keys = [day.get("date") or None for day in recent]
+        per_cow_days.append((keys, kg))
+        for day, key, value in zip(recent, keys, kg):
+            if not key:
+                continue
+            by_date.setdefault(key, []).append(value)
+            heat_votes.setdefault(key, []).append(1 if _is_heat_day(day) else 0)
+    cows = len(per_cow_days)
+
+    dates = sorted(by_date)
+    if not dates:
+        base = sum(float(kg.mean()) for _, kg in per_cow_days)
+        idio_var = sum(float(kg.var(ddof=1)) for _, kg in per_cow_days if len(kg) > 1)
+        return FeedModel(base, idio_var ** 0.5, [1.0] * 7, 1.0, 0.0, 0.0, 0.0, None, cows, 0)
+
+    per_cow = np.array([np.mean(by_date[d]) for d in dates])
+    weekday = np.array([date.fromisoformat(d).weekday() for d in dates])
+    heat = np.array([np.mean(heat_votes[d]) >= 0.5 for d in dates])
+    overall = per_cow.mean() if per_cow.mean() > 0 else 1.0
+
+    # Effects are shrunk toward 1 by sample size so a couple of odd days do
+    # not dominate the forecast.
+    heat_factor = 1.0
+    if heat.any() and (~heat).any():
+        raw = per_cow[heat].mean() / max(per_cow[~heat].mean(), 1e-9)
+        n = heat.sum()
+        heat_factor = 1.0 + (raw - 1.0) * n / (n + 3.0)
+
+    adjusted = per_cow / np.where(heat, heat_factor, 1.0)
+    dow = np.ones(7)
+    for wd in range(7):
+        mask = weekday == wd
+        n = mask.sum()
+        if n:
+            dow[wd] = 1.0 + (adjusted[mask].mean() / overall - 1.0) * n / (n + 2.0)
+    dow /= dow.mean()
+
+    resid = np.log(np.maximum(adjusted / (overall * dow[weekday]), 1e-6))
+    resid -= resid.mean()
+    shock_sd = float(resid.std(ddof=1)) if len(resid) > 2 else 0.0
+    ar1 = 0.0
+    if len(resid) > 3 and shock_sd > 0:
+        ar1 = float(np.clip(np.corrcoef(resid[:-1], resid[1:])[0, 1], 0.0, 0.9))
+
+    # The simulation multiplies dow and heat back in, so each cow's level is
+    # taken on days with those effects divided out.
+    effect = {d: float(dow[wd]) * (heat_factor if h else 1.0) for d, wd, h in zip(dates, weekday, heat)}
+    base = 0.0
+    idio_var = 0.0
+    for keys, kg in per_cow_days:
+        level = kg / np.array([effect.get(key, 1.0) for key in keys])
+        base += float(level.mean())
+        idio_var += float(level.var(ddof=1)) if len(level) > 1 else 0.0
+
+    # Per-cow variance already contains the herd-wide part; keep only the
+    # idiosyncratic remainder so it is not counted twice.
+    idio_var = max(0.0, idio_var - cows * (overall * shock_sd) ** 2)
+
+    return FeedModel(
+        base_kg_day=base,
+        idio_sd_kg=float(idio_var) ** 0.5,
+        dow_factors=[round(float(f), 4) for f in dow],
+        heat_factor=round(float(heat_factor), 4),
+        heat_day_frequency=round(float(heat.mean()), 4),
+        shock_sd=round(shock_sd, 4),
+        shock_ar1=round(ar1, 4),
+        last_date=date.fromisoformat(dates[-1]),
+        cows=cows,
+        days_observed=len(dates),
+    )
+
+
+def simulate_feed_paths(
+    model: FeedModel,
+    horizon_days: int = 90,
+    n_paths: int = 4000,
+    seed: Optional[int] = None,
+    start_date: Optional[date] = None,
+    heat_probability: Union[float, Sequence[float]] = 0.0,
+) -> np.ndarray:
+    """Return an (n_paths, horizon_days) array of simulated herd feed kg/day."""
+    rng = np.random.default_rng(seed)
+    start = start_date or ((model.last_date or date.today()) + timedelta(days=1))
+    weekday = (start.weekday() + np.arange(horizon_days)) % 7
+    mean = model.base_kg_day * np.asarray(model.dow_factors)[weekday]
+
+    heat_p = np.broadcast_to(np.asarray(heat_probability, dtype=float), (horizon_days,))
+    heat = rng.random((n_paths, horizon_days)) < heat_p
+    mean = mean * np.where(heat, model.heat_factor, 1.0)
+
+    if model.shock_sd > 0:
+        eps = rng.standard_normal((n_paths, horizon_days))
+        innov = model.shock_sd * np.sqrt(1.0 - model.shock_ar1 ** 2)
+        shock = np.empty_like(eps)
+        shock[:, 0] = eps[:, 0] * model.shock_sd
+        for t in range(1, horizon_days):
+            shock[:, t] = model.shock_ar1 * shock[:, t - 1] + innov * eps[:, t]
+        mean = mean * np.exp(shock - 0.5 * model.shock_sd ** 2)
+
+    if model.idio_sd_kg > 0:
+        mean = mean + rng.standard_normal((n_paths, horizon_days)) * model.idio_sd_kg
+
+    return np.maximum(mean, 0.0)
+
+
+def _bands(values: np.ndarray, digits: int = 2) -> Dict[str, float]:
+    return {f"p{p}": round(float(v), digits) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def forecast_feed(
+    history_by_tag: Dict[str, List[Dict]],
+    settings: Dict,
+    active_tags: Optional[Iterable[str]] = None,
+    horizon_days: int = 90,
+    n_paths: int = 4000,
+    seed: Optional[int] = None,
+    heat_probability: Union[float, Sequence[float], None] = None,
+    start_date: Optional[date] = None,
+) -> Dict:
+    model = fit_feed_model(history_by_tag, active_tags)
+    if heat_probability is None:
+        heat_probability = model.heat_day_frequency
+
+    result: Dict = {
+        "paths": n_paths,
+        "horizon_days": horizon_days,
+        "seed": seed,
+        "model": {
+            "cows": model.cows,
+            "days_observed": model.days_observed,
+            "base_kg_day": round(model.base_kg_day, 2),
+            "day_of_week_factors": model.dow_factors,
+            "heat_factor": model.heat_factor,
+            "heat_day_frequency": model.heat_day_frequency,
+            "shock_sd": model.shock_sd,
+            "shock_ar1": model.shock_ar1,
+        },
+        "feed_burn_rate_kg_day": None,
+        "projected_monthly_feed_cost": None,
+        "days_of_feed_remaining": None,
+        "stockout_date": None,
+        "stockout_probability": None,
+    }
+    if model.base_kg_day <= 0 or horizon_days <= 0:
+        return result
+
+    start = start_date or ((model.last_date or date.today()) + timedelta(days=1))
+    paths = simulate_feed_paths(model, horizon_days, n_paths, seed, start, heat_probability)
+    cost_per_kg = float(settings.get("feed_cost_per_kg", 0.0))
+
+    result["feed_burn_rate_kg_day"] = _bands(paths.mean(axis=1))
+    month = paths[:, :30].sum(axis=1) * (30 / min(30, horizon_days))
+    result["projected_monthly_feed_cost"] = _bands(month * cost_per_kg)
+
+    inventory = settings.get("available_feed_kg_current")
+    if inventory:
+        cum = np.cumsum(paths, axis=1)
+        hit = cum >= float(inventory)
+        ran_out = hit.any(axis=1)
+        first = hit.argmax(axis=1)
+        # Interpolate within the stock-out day for fractional days remaining.
+        before = np.where(first > 0, cum[np.arange(n_paths), first - 1], 0.0)
+        day_use = np.maximum(paths[np.arange(n_paths), first], 1e-9)
+        # Paths that never run out sit past the horizon; their bands read None.
+        days_left = np.where(ran_out, first + (float(inventory) - before) / day_use, horizon_days + 1.0)
+
+        pct = np.percentile(days_left, PERCENTILES)
+        result["days_of_feed_remaining"] = {
+            f"p{p}": None if v > horizon_days else round(float(v), 1) for p, v in zip(PERCENTILES, pct)
+        }
+        result["stockout_date"] = {
+            f"p{p}": None if v > horizon_days else (start + timedelta(days=int(v))).isoformat()
+            for p, v in zip(PERCENTILES, pct)
+        }
+        result["stockout_probability"] = round(float(ran_out.mean()), 3)
+
+    return result
@@ -0,0 +1,327 @@
+"""Herd-wide signal distributions and cohort-shift detection.
+
+`score_insights` compares a cow with her own baseline. This index looks at the
+herd instead: it keeps per-day median/MAD of each signal for the whole herd and
+for each feeding station / water point, updated as logs arrive, and flags
+stations whose cohort moved together versus recent days (a failing trough or
+feeder shows up here long before each cow trips her own alert).
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from math import isfinite
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+HERD = "herd"
+
+SIGNAL_GROUPS = {
+    "trough_minutes_today": "feeding",
+    "meals_count_today": "feeding",
+    "feed_intake_est_kg_today": "feeding",
+    "water_visits_today": "water",
+    "water_minutes_today": "water",
+    "activity_index_today": HERD,
+    "alone_minutes_today": HERD,
+    "lying_minutes_today": HERD,
+}
+
+MAD_SCALE = 1.4826
+
+GroupKey = Tuple[str, str]
+
+
+@dataclass
+class SignalStats:
+    median: float
+    mad: float
+    n: int
+
+
+@dataclass
+class CohortShift:
+    group: str
+    station: str
+    signal: str
+    median: float
+    baseline: float
+    shift_pct: float
+    z: float
+    cows: int
+
+
+def _signal_values(day_log: Dict) -> Dict[str, float]:
+    # Parsed up front so a non-numeric value is skipped before the index is
+    # touched, rather than failing halfway through an update.
+    out: Dict[str, float] = {}
+    for signal in SIGNAL_GROUPS:
+        value = day_log.get(signal)
+        if value is None or isinstance(value, bool):
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError, OverflowError):
+            continue
+        if isfinite(value):
+            out[signal] = value
+    return out
+
+
+def _median(sorted_values: List[float]) -> float:
+    n = len(sorted_values)
+    mid = n // 2
+    if n % 2:
+        return sorted_values[mid]
+    return (sorted_values[mid - 1] + sorted_values[mid]) / 2
+
+
+def _stats(sorted_values: List[float]) -> SignalStats:
+    med = _median(sorted_values)
+    mad = _median(sorted(abs(v - med) for v in sorted_values))
+    return SignalStats(median=med, mad=mad, n=len(sorted_values))
+
+
+class HerdIndex:
+    def __init__(
+        self,
+        settings: Optional[Dict] = None,
+        baseline_days: int = 7,
+        z_threshold: float = 3.0,
+        min_shift_pct: float = 0.15,
+        min_cows: int = 3,
+    ):
+        settings = settings or {}
+        self.default_stations = {
+            "feeding": settings.get("feeding_station_label") or "station-1",
+            "water": settings.get("water_point_label") or "water-1",
+        }
+        self.baseline_days = max(1, baseline_days)
+        self.z_threshold = z_threshold
+        self.min_shift_pct = min_shift_pct
+        self.min_cows = max(1, min_cows)
+
+        self._stations: Dict[str, Dict[str, str]] = {}
+        self._values: Dict[Tuple[str, str, GroupKey], List[float]] = {}
+        self._by_cow_day: Dict[Tuple[str, str], Dict[str, Tuple[float, GroupKey]]] = {}
+        self._stats: Dict[Tuple[str, str, GroupKey], SignalStats] = {}
+        self._dates: List[str] = []
+        self._shifts: Dict[str, List[CohortShift]] = {}
+
+    @classmethod
+    def from_payload(cls, payload: Dict, settings: Optional[Dict] = None, **kwargs) -> "HerdIndex":
+        index = cls(settings, **kwargs)
+        index.set_cows(payload.get("cows", []))
+        index.add_logs((tag, row) for tag, rows in payload.get("daily_logs_by_ear_tag", {}).items() for row in rows)
+        return index
+
+    def set_cows(self, cows: List[Dict]) -> None:
+        for cow in cows:
+            self.set_cow_stations(
+                cow.get("ear_tag_id", ""),
+                feeding=cow.get("feeding_station_id"),
+                water=cow.get("water_point_id"),
+            )
+
+    def set_cow_stations(self, ear_tag_id: str, feeding: Optional[str] = None, water: Optional[str] = None) -> None:
+        tag = ear_tag_id.strip().upper()
+        self._stations[tag] = {
+            "feeding": feeding or self.default_stations["feeding"],
+            "water": water or self.default_stations["water"],
+        }
+
+    def _group_keys(self, tag: str, signal: str) -> List[GroupKey]:
+        keys: List[GroupKey] = [(HERD, HERD)]
+        group = SIGNAL_GROUPS[signal]
+        if group != HERD:
+            station = self._stations.get(tag, {}).get(group, self.default_stations[group])
+            keys.append((group, station))
+        return keys
+
+    def _touch(self, day: str, signal: str, key: GroupKey) -> None:
+        self._stats.pop((day, signal, key), None)
+        for cached_day in [d for d in self._shifts if d >= day]:
+            del self._shifts[cached_day]
+
+    def add_log(self, ear_tag_id: str, day_log: Dict) -> None:
+        day = day_log.get("date")
+        if not day:
+            return
+        tag = ear_tag_id.strip().upper()
+        values = _signal_values(day_log)
+        self.remove_log(tag, day)
+
+        entries: Dict[str, Tuple[float, GroupKey]] = {}
+        for signal, value in values.items():
+            for key in self._group_keys(tag, signal):
+                insort(self._values.setdefault((day, signal, key), []), value)
+                self._touch(day, signal, key)
+            entries[signal] = (value, self._group_keys(tag, signal)[-1])
+
+        self._by_cow_day[(tag, day)] = entries
+        pos = bisect_left(self._dates, day)
+        if pos == len(self._dates) or self._dates[pos] != day:
+            self._dates.insert(pos, day)
+
+    def add_logs(self, logs: Iterable[Tuple[str, Dict]]) -> None:
+        # Bulk version of add_log: values are appended per key and each touched
+        # list is sorted once instead of insort-ing row by row.
+        latest: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for ear_tag_id, day_log in logs:
+            day = day_log.get("date")
+            if day:
+                latest[(ear_tag_id.strip().upper(), day)] = _signal_values(day_log)
+        if not latest:
+            return
+
+        for tag, day in latest:
+            self.remove_log(tag, day)
+
+        herd_key: GroupKey = (HERD, HERD)
+        by_day: Dict[str, Dict[str, Tuple[List[float], Dict[GroupKey, List[float]]]]] = {}
+        keys_by_tag: Dict[str, List[Tuple[str, GroupKey]]] = {}
+        for (tag, day), parsed in latest.items():
+            signal_keys = keys_by_tag.get(tag)
+            if signal_keys is None:
+                signal_keys = keys_by_tag[tag] = [(s, self._group_keys(tag, s)[-1]) for s in SIGNAL_GROUPS]
+            columns = by_day.get(day)
+            if columns is None:
+                columns = by_day[day] = {s: ([], {}) for s in SIGNAL_GROUPS}
+            entries: Dict[str, Tuple[float, GroupKey]] = {}
+            for signal, station_key in signal_keys:
+                value = parsed.get(signal)
+                if value is None:
+                    continue
+                herd, stations = columns[signal]
+                herd.append(value)
+                if station_key != herd_key:
+                    bucket = stations.get(station_key)
+                    if bucket is None:
+                        stations[station_key] = [value]
+                    else:
+                        bucket.append(value)
+                entries[signal] = (value, station_key)
+            self._by_cow_day[(tag, day)] = entries
+
+        for day, columns in by_day.items():
+            for signal, (herd, stations) in columns.items():
+                for key, values in [(herd_key, herd), *stations.items()]:
+                    if not values:
+                        continue
+                    existing = self._values.get((day, signal, key))
+                    if existing:
+                        values.extend(existing)
+                    values.sort()
+                    self._values[(day, signal, key)] = values
+                    self._stats.pop((day, signal, key), None)
+        first = min(day for _, day in latest)
+        for cached_day in [d for d in self._shifts if d >= first]:
+            del self._shifts[cached_day]
+        self._dates = sorted(set(self._dates).union(day for _, day in latest))
+
+    def remove_log(self, ear_tag_id: str, day: str) -> None:
+        tag = ear_tag_id.strip().upper()
+        entries = self._by_cow_day.pop((tag, day), None)
+        if not entries:
+            return
+        for signal, (value, station_key) in entries.items():
+            keys = [(HERD, HERD)] if station_key == (HERD, HERD) else [(HERD, HERD), station_key]
+            for key in keys:
+                values = self._values[(day, signal, key)]
+                del values[bisect_left(values, value)]
+                self._touch(day, signal, key)
+
+    def prune_before(self, day: str) -> None:
+        stale = [d for d in self._dates if d < day]
+        if not stale:
+            return
+        cut = set(stale)
+        self._dates = self._dates[len(stale):]
+        for store in (self._values, self._stats):
+            for k in [k for k in store if k[0] in cut]:
+                del store[k]
+        for k in [k for k in self._by_cow_day if k[1] in cut]:
+            del self._by_cow_day[k]
+        for d in cut:
+            self._shifts.pop(d, None)
+
+    def stats(self, day: str, signal: str, group: str = HERD, station: str = HERD) -> Optional[SignalStats]:
+        key = (day, signal, (group, station))
+        cached = self._stats.get(key)
+        if cached is not None:
+            return cached
+        values = self._values.get(key)
+        if not values:
+            return None
+        self._stats[key] = result = _stats(values)
+        return result
+
+    def herd_distribution(self, day: str) -> Dict[str, SignalStats]:
+        out = {}
+        for signal in SIGNAL_GROUPS:
+            s = self.stats(day, signal)
+            if s is not None:
+                out[signal] = s
+        return out
+
+    def cohort_shifts(self, day: str) -> List[CohortShift]:
+        cached = self._shifts.get(day)
+        if cached is not None:
+            return cached
+
+        pos = bisect_left(self._dates, day)
+        history = self._dates[max(0, pos - self.baseline_days):pos]
+        shifts: List[CohortShift] = []
+        if history:
+            keys = sorted({(s, k) for (d, s, k) in self._values if d == day})
+            for signal, (group, station) in keys:
+                shift = self._score(day, history, signal, group, station)
+                if shift is not None:
+                    shifts.append(shift)
+            shifts.sort(key=lambda s: abs(s.z), reverse=True)
+
+        self._shifts[day] = shifts
+        return shifts
+
+    def _score(self, day: str, history: List[str], signal: str, group: str, station: str) -> Optional[CohortShift]:
+        today = self.stats(day, signal, group, station)
+        if today is None or today.n < self.min_cows:
+            return None
+        past = [s for s in (self.stats(d, signal, group, station) for d in history) if s is not None]
+        if not past:
+            return None
+
+        baseline = _median(sorted(s.median for s in past))
+        spread = MAD_SCALE * _median(sorted(s.mad for s in past))
+        day_to_day = MAD_SCALE * _median(sorted(abs(s.median - baseline) for s in past))
+        scale = max(spread / (today.n ** 0.5), day_to_day, abs(baseline) * 0.02, 1e-6)
+
+        z = (today.median - baseline) / scale
+        shift_pct = (today.median - baseline) / baseline if baseline else 0.0
+        if abs(z) < self.z_threshold or abs(shift_pct) < self.min_shift_pct:
+            return None
+        return CohortShift(
+            group=group,
+            station=station,
+            signal=signal,
+            median=round(today.median, 2),
+            baseline=round(baseline, 2),
+            shift_pct=round(shift_pct, 3),
+            z=round(z, 2),
+            cows=today.n,
+        )
+
+    def anomalous_stations(self, day: str) -> List[Dict]:
+        stations: Dict[GroupKey, Dict] = {}
+        for shift in self.cohort_shifts(day):
+            if shift.group == HERD:
+                continue
+            entry = stations.setdefault(
+                (shift.group, shift.station),
+                {"group": shift.group, "station": shift.station, "cows": shift.cows, "signals": []},
+            )
+            entry["signals"].append(
+                {"signal": shift.signal, "shift_pct": shift.shift_pct, "z": shift.z}
+            )
+        return list(stations.values())
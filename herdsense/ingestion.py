@@ -0,0 +1,271 @@
+"""Streaming ingestion: raw ear-tag detections -> per-cow daily log rows.
+
+Events are newline-delimited JSON objects, for example::
+
+    {"ear_tag_id": "EA-1001", "ts": "2026-10-18T06:42:00", "kind": "meal", "minutes": 14.5}
+
+`kind` is one of meal, trough, water, alone. Days are aggregated incrementally
+and flushed once the stream has moved past them, so only open days are held
+in memory regardless of event volume.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+
+from data_store import DataStore
+from signal_sanitizer import sanitize_records
+
+
+EVENT_KINDS = {"meal", "trough", "water", "alone"}
+
+Batch = List[Tuple[str, Dict]]
+
+
+def normalize_tag(raw: Optional[str]) -> str:
+    return "".join((raw or "").split()).upper()
+
+
+def build_tag_index(cows: List[Dict], include_inactive: bool = False) -> Dict[str, str]:
+    index: Dict[str, str] = {}
+    for cow in cows:
+        if not include_inactive and not cow.get("is_active", True):
+            continue
+        tag = normalize_tag(cow.get("ear_tag_id"))
+        if tag:
+            index[tag] = cow.get("ear_tag_id", tag).strip().upper()
+    return index
+
+
+@dataclass
+class IngestStats:
+    events: int = 0
+    matched: int = 0
+    malformed: int = 0
+    late: int = 0
+    days_flushed: int = 0
+    batches: int = 0
+    unmatched_tags: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def unmatched(self) -> int:
+        return sum(self.unmatched_tags.values())
+
+
+class _DayCounters:
+    __slots__ = ("trough", "meals", "meal_minutes", "water", "water_minutes", "alone", "meal_times", "water_times")
+
+    def __init__(self) -> None:
+        self.trough = 0.0
+        self.meals = 0
+        self.meal_minutes = 0.0
+        self.water = 0
+        self.water_minutes = 0.0
+        self.alone = 0.0
+        self.meal_times: List[int] = []
+        self.water_times: List[int] = []
+
+    def add(self, kind: str, minute: int, minutes: float) -> None:
+        if kind == "meal":
+            self.meals += 1
+            self.meal_minutes += minutes
+            self.trough += minutes
+            self.meal_times.append(minute)
+        elif kind == "trough":
+            self.trough += minutes
+        elif kind == "water":
+            self.water += 1
+            self.water_minutes += minutes
+            self.water_times.append(minute)
+        elif kind == "alone":
+            self.alone += minutes
+
+    def to_log(self, day: date) -> Dict:
+        return {
+            "date": day.isoformat(),
+            "trough_minutes_today": round(self.trough, 2),
+            "meals_count_today": self.meals,
+            "avg_meal_minutes_today": round(self.meal_minutes / self.meals, 2) if self.meals else None,
+            "water_visits_today": self.water,
+            "water_minutes_today": round(self.water_minutes, 2),
+            "alone_minutes_today": round(self.alone, 2),
+            "meal_timestamps": self.meal_times,
+            "water_timestamps": self.water_times,
+        }
+
+
+def _parse_event(event: Dict) -> Optional[Tuple[str, date, int, str, float]]:
+    kind = event.get("kind")
+    if kind not in EVENT_KINDS:
+        return None
+    try:
+        ts = datetime.fromisoformat(str(event["ts"]))
+        minutes = float(event.get("minutes") or 0.0)
+    except (KeyError, TypeError, ValueError):
+        return None
+    return event.get("ear_tag_id"), ts.date(), ts.hour * 60 + ts.minute, kind, max(0.0, minutes)
+
+
+class DailyAggregator:
+    """Accumulates detections per (ear tag, day) and emits finished days in batches.
+
+    A day is finished once an event arrives more than `lateness_days` after it;
+    events for already-flushed days are counted as late and dropped. `close()`
+    only emits finished days, so one aggregator can span several streams from
+    the same source without writing a partial row for a day still in progress.
+    """
+
+    def __init__(self, tag_index: Dict[str, str], batch_size: int = 500, lateness_days: int = 0):
+        self.tag_index = tag_index
+        self.batch_size = max(1, batch_size)
+        self.lateness = timedelta(days=max(0, lateness_days))
+        self.stats = IngestStats()
+        self._open: Dict[date, Dict[str, _DayCounters]] = {}
+        self._watermark: Optional[date] = None
+        self._pending: Batch = []
+
+    def feed(self, event: Dict) -> List[Batch]:
+        self.stats.events += 1
+        parsed = _parse_event(event)
+        if parsed is None:
+            self.stats.malformed += 1
+            return []
+
+        raw_tag, day, minute, kind, minutes = parsed
+        tag = self.tag_index.get(normalize_tag(raw_tag))
+        if tag is None:
+            key = normalize_tag(raw_tag) or "<blank>"
+            self.stats.unmatched_tags[key] = self.stats.unmatched_tags.get(key, 0) + 1
+            return []
+
+        if self._watermark is not None and day < self._watermark - self.lateness and day not in self._open:
+            self.stats.late += 1
+            return []
+
+        self.stats.matched += 1
+        self._open.setdefault(day, {}).setdefault(tag, _DayCounters()).add(kind, minute, minutes)
+
+        if self._watermark is None or day > self._watermark:
+            self._watermark = day
+            return self._close_before(self._cutoff())
+        return []
+
+    def _cutoff(self) -> date:
+        return date.min if self._watermark is None else self._watermark - self.lateness
+
+    def _close_before(self, cutoff: date) -> List[Batch]:
+        batches: List[Batch] = []
+        for day in sorted(d for d in self._open if d < cutoff):
+            for tag, counters in self._open.pop(day).items():
+                self._pending.append((tag, counters.to_log(day)))
+                self.stats.days_flushed += 1
+                if len(self._pending) >= self.batch_size:
+                    batches.append(self._take_batch())
+        return batches
+
+    def _take_batch(self) -> Batch:
+        batch, self._pending = self._pending, []
+        rows, _ = sanitize_records([log for _, log in batch])
+        self.stats.batches += 1
+        return [(tag, row) for (tag, _), row in zip(batch, rows)]
+
+    def close(self, final: bool = False) -> List[Batch]:
+        # `final` also flushes days still open (end of a one-off backfill).
+        batches = self._close_before(date.max if final else self._cutoff())
+        if self._pending:
+            batches.append(self._take_batch())
+        return batches
+
+
+def parse_lines(lines: Iterable[str]) -> Iterator[Dict]:
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            event = {}
+        yield event if isinstance(event, dict) else {}
+
+
+def ingest_events(events: Iterable[Dict], aggregator: DailyAggregator, final: bool = False) -> Iterator[Batch]:
+    for event in events:
+        yield from aggregator.feed(event)
+    yield from aggregator.close(final)
+
+
+def ingest_file(path: str, aggregator: DailyAggregator, final: bool = False) -> Iterator[Batch]:
+    with open(path) as handle:
+        yield from ingest_events(parse_lines(handle), aggregator, final)
+
+
+async def ingest_reader(reader: asyncio.StreamReader, aggregator: DailyAggregator) -> AsyncIterator[Batch]:
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        for event in parse_lines([line.decode("utf-8", errors="replace")]):
+            for batch in aggregator.feed(event):
+                yield batch
+    for batch in aggregator.close():
+        yield batch
+
+
+def write_batches(store: DataStore, batches: Iterable[Batch]) -> int:
+    written = 0
+    for batch in batches:
+        store.append_daily_logs(batch)
+        written += len(batch)
+    return written
+
+
+async def serve_ingestion(
+    store: DataStore,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    batch_size: int = 500,
+    lateness_days: int = 0,
+) -> asyncio.AbstractServer:
+    """Accept NDJSON detection streams over TCP.
+
+    Aggregators are kept per source host, so a gateway that reconnects resumes
+    its open days instead of re-writing them; stats are cumulative per source.
+    """
+    aggregators: Dict[str, DailyAggregator] = {}
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        source = str(peer[0]) if isinstance(peer, tuple) else str(peer)
+        tag_index = build_tag_index(store.load().get("cows", []))
+        aggregator = aggregators.get(source)
+        if aggregator is None:
+            aggregator = aggregators[source] = DailyAggregator(tag_index, batch_size, lateness_days)
+        else:
+            aggregator.tag_index = tag_index
+        try:
+            async for batch in ingest_reader(reader, aggregator):
+                await asyncio.to_thread(store.append_daily_logs, batch)
+            stats = aggregator.stats
+            writer.write(
+                json.dumps(
+                    {
+                        "events": stats.events,
+                        "matched": stats.matched,
+                        "unmatched": stats.unmatched,
+                        "malformed": stats.malformed,
+                        "late": stats.late,
+                        "days_flushed": stats.days_flushed,
+                    }
+                ).encode()
+                + b"\n"
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -4,6 +4,8 @@ from __future__ import annotations
 
 from typing import Dict, List, Optional
 
+from signal_sanitizer import sanitize_history
+
 
 FEED_FROM_TROUGH_RATE = 0.048
 FEED_FROM_MEALS_RATE = 0.1
@@ -25,8 +27,8 @@ def compute_weekly_feed_spend(
     total_kg = 0.0
     estimated = False
 
-    for series in history_by_tag.values():
-        last = series[-days:]
+    recent, _ = sanitize_history({tag: series[-days:] for tag, series in history_by_tag.items()})
+    for last in recent.values():
         for day in last:
             if day.get("feed_intake_est_kg_today") is None:
                 estimated = True
@@ -64,9 +66,22 @@ def compute_money_leaks(
     congestion_level: str,
     heat_risk_count: int,
     underperformer_name: Optional[str] = None,
+    station_alerts: Optional[List[Dict]] = None,
 ) -> List[Dict]:
     leaks: List[Dict] = []
 
+    if station_alerts:
+        alert = station_alerts[0]
+        point = "water point" if alert["group"] == "water" else "feeding station"
+        leaks.append(
+            {
+                "title": f"Herd-wide shift at {point} {alert['station']}",
+                "why": f"{alert['cows']} cows changed together today, which points to equipment rather than individual health.",
+                "action": "Inspect trough flow / feeder delivery at this station before checking individual cows.",
+                "impact_range_week": f"${round(weekly_feed_spend * 0.01)}-${round(weekly_feed_spend * 0.04)}",
+            }
+        )
+
     if underperformer_name:
         leaks.append(
             {
@@ -5,6 +5,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 
+from signal_sanitizer import sanitize_herd_day
+
 
 @dataclass
 class Recommendation:
@@ -24,6 +26,7 @@ def estimate_feed_kg(signal: Dict) -> float:
 
 
 def feed_rows(cows: List[Dict], today_by_tag: Dict[str, Dict], feed_cost_per_kg: float) -> List[Dict]:
+    today_by_tag, _ = sanitize_herd_day(today_by_tag)
     rows = []
     for cow in cows:
         if not cow.get("is_active", True):
@@ -48,6 +51,7 @@ def feed_rows(cows: List[Dict], today_by_tag: Dict[str, Dict], feed_cost_per_kg:
 
 
 def congestion_summary(cows: List[Dict], today_by_tag: Dict[str, Dict]) -> Dict:
+    today_by_tag, _ = sanitize_herd_day(today_by_tag)
     slots = [0] * 48
     for cow in cows:
         if not cow.get("is_active", True):
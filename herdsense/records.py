@@ -0,0 +1,202 @@
+"""Compact record types for cows, task occurrences, and daily signals.
+
+Records are frozen, slotted dataclasses that also behave as read-only mappings
+(`get`, `[]`, `in`, `**`), so engines written against dicts accept them
+unchanged. Fields left at None read as missing, like an absent dict key;
+keys that were explicitly None are listed in `nulls` and stay present. Keys
+outside the declared fields are kept in `extra` so `to_dict` round-trips.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, ClassVar, Dict, FrozenSet, Iterator, Optional, Tuple, Type, TypeVar, Union
+
+
+R = TypeVar("R", bound="_Record")
+
+_FIELD_NAMES: Dict[type, Tuple[str, ...]] = {}
+# Same names as a set, for membership tests on the `get` hot path.
+_FIELD_SETS: Dict[type, FrozenSet[str]] = {}
+
+
+def _names(cls: type) -> Tuple[str, ...]:
+    names = _FIELD_NAMES.get(cls)
+    if names is None:
+        names = _FIELD_NAMES[cls] = tuple(f.name for f in fields(cls) if f.name not in ("extra", "nulls"))
+        _FIELD_SETS[cls] = frozenset(names)
+    return names
+
+
+def _name_set(cls: type) -> FrozenSet[str]:
+    names = _FIELD_SETS.get(cls)
+    if names is None:
+        _names(cls)
+        names = _FIELD_SETS[cls]
+    return names
+
+
+class _Record(Mapping):
+    __slots__ = ()
+
+    _TUPLE_FIELDS: ClassVar[FrozenSet[str]] = frozenset()
+
+    @classmethod
+    def from_dict(cls: Type[R], data: Union[Mapping, R]) -> R:
+        if isinstance(data, cls):
+            return data
+        names = _name_set(cls)
+        values = {}
+        nulls = set()
+        extra = None
+        for key, value in data.items():
+            if key in names:
+                if value is None:
+                    nulls.add(key)
+                elif key in cls._TUPLE_FIELDS and isinstance(value, list):
+                    value = tuple(value)
+                values[key] = value
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        return cls(**values, extra=extra, nulls=frozenset(nulls))
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for name in _names(type(self)):
+            value = getattr(self, name)
+            if value is None and name not in self.nulls:
+                continue
+            out[name] = list(value) if name in self._TUPLE_FIELDS else value
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def with_changes(self: R, **changes: Any) -> R:
+        names = _name_set(type(self))
+        core = {k: v for k, v in changes.items() if k in names}
+        rest = {k: v for k, v in changes.items() if k not in names}
+        for key in self._TUPLE_FIELDS.intersection(core):
+            if isinstance(core[key], list):
+                core[key] = tuple(core[key])
+        if core:
+            cleared = {k for k, v in core.items() if v is None}
+            core["nulls"] = frozenset(self.nulls.difference(core)) | cleared
+        if rest:
+            core["extra"] = {**(self.extra or {}), **rest}
+        return replace(self, **core)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        names = _FIELD_SETS.get(type(self)) or _name_set(type(self))
+        if key in names:
+            value = getattr(self, key)
+            return default if value is None and key not in self.nulls else value
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        for name in _names(type(self)):
+            if getattr(self, name) is not None or name in self.nulls:
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+_MISSING = object()
+
+
+@dataclass(frozen=True, slots=True)
+class Cow(_Record):
+    cow_id: Optional[str] = None
+    ear_tag_id: Optional[str] = None
+    ear_tag_color: Optional[str] = None
+    name: Optional[str] = None
+    production_type: Optional[str] = None
+    sex: Optional[str] = None
+    date_of_birth: Optional[str] = None
+    age_years: Optional[float] = None
+    lactation_stage: Optional[str] = None
+    pregnancy_due_days: Optional[float] = None
+    pregnancy_due_date: Optional[str] = None
+    vaccination_status: Optional[Tuple[str, ...]] = None
+    notes: Optional[str] = None
+    weight_kg: Optional[float] = None
+    planned_cull_or_sale_date: Optional[str] = None
+    target_weight_or_goal: Optional[str] = None
+    feed_intake_mode: Optional[str] = None
+    manual_feed_kg_per_day: Optional[float] = None
+    expected_sale_value: Optional[float] = None
+    feeding_station_id: Optional[str] = None
+    water_point_id: Optional[str] = None
+    is_active: Optional[bool] = None
+    extra: Optional[Dict[str, Any]] = field(default=None, hash=False)
+    nulls: FrozenSet[str] = field(default=frozenset(), hash=False)
+
+    _TUPLE_FIELDS: ClassVar[FrozenSet[str]] = frozenset({"vaccination_status"})
+
+
+@dataclass(frozen=True, slots=True)
+class TaskOccurrence(_Record):
+    occurrence_id: Optional[str] = None
+    template_id: Optional[str] = None
+    title: Optional[str] = None
+    category: Optional[str] = None
+    due_date: Optional[str] = None
+    due_time: Optional[str] = None
+    assigned_to: Optional[str] = None
+    status: Optional[str] = None
+    recurrence: Optional[Dict[str, Any]] = field(default=None, hash=False)
+    source: Optional[str] = None
+    created_at: Optional[str] = None
+    completed_at: Optional[str] = None
+    notes: Optional[str] = None
+    extra: Optional[Dict[str, Any]] = field(default=None, hash=False)
+    nulls: FrozenSet[str] = field(default=frozenset(), hash=False)
+
+
+@dataclass(frozen=True, slots=True)
+class DaySignal(_Record):
+    date: Optional[str] = None
+    trough_minutes_today: Optional[float] = None
+    meals_count_today: Optional[float] = None
+    avg_meal_minutes_today: Optional[float] = None
+    feed_intake_est_kg_today: Optional[float] = None
+    temp_c_today: Optional[float] = None
+    humidity_pct_today: Optional[float] = None
+    alone_minutes_today: Optional[float] = None
+    activity_index_today: Optional[float] = None
+    lying_minutes_today: Optional[float] = None
+    water_visits_today: Optional[float] = None
+    water_minutes_today: Optional[float] = None
+    milk_liters_today: Optional[float] = None
+    meal_timestamps: Optional[Tuple[int, ...]] = None
+    water_timestamps: Optional[Tuple[int, ...]] = None
+    extra: Optional[Dict[str, Any]] = field(default=None, hash=False)
+    nulls: FrozenSet[str] = field(default=frozenset(), hash=False)
+
+    _TUPLE_FIELDS: ClassVar[FrozenSet[str]] = frozenset({"meal_timestamps", "water_timestamps"})
+
+
+def as_dict(record: Mapping) -> Dict[str, Any]:
+    if isinstance(record, _Record):
+        return record.to_dict()
+    return record if isinstance(record, dict) else dict(record)
+
+
+def updated(record: Mapping, **changes: Any) -> Mapping:
+    """Copy `record` with `changes`, preserving its type (record or dict)."""
+    if isinstance(record, _Record):
+        return record.with_changes(**changes)
+    return {**record, **changes}
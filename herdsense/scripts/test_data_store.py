@@ -0,0 +1,158 @@
+"""Regression checks for DataStore's retry, conflict and lock paths.
+
+Run from the herdsense directory: python scripts/test_data_store.py
+"""
+
+import os
+import stat
+import sys
+import tempfile
+from multiprocessing import Pool
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_store import ConflictError, DataStore  # noqa: E402
+
+
+WORKERS = 4
+WRITES_PER_WORKER = 25
+
+
+def _writer(args):
+    path, worker = args
+    store = DataStore(Path(path))
+    for i in range(WRITES_PER_WORKER):
+        if i % 2:
+            store.upsert_cow({"cow_id": f"c{worker}-{i}", "ear_tag_id": f"EA-{worker}-{i}"})
+        else:
+            store.append_daily_log(f"EA-{worker}", {"date": f"2026-01-{i + 1:02d}"})
+
+
+def check_concurrent_writers(root):
+    path = root / "concurrent.json"
+    with Pool(WORKERS) as pool:
+        pool.map(_writer, [(str(path), w) for w in range(WORKERS)])
+
+    store = DataStore(path)
+    payload = store.load()
+    cows = WORKERS * (WRITES_PER_WORKER // 2)
+    logs = WORKERS * (WRITES_PER_WORKER - WRITES_PER_WORKER // 2)
+    assert len(payload["cows"]) == cows, "concurrent upserts were lost"
+    assert sum(len(v) for v in payload["daily_logs_by_ear_tag"].values()) == logs, "concurrent log appends were lost"
+    assert store.revision() == WORKERS * WRITES_PER_WORKER, "every commit should bump the revision once"
+
+
+def check_retry_reapplies(root):
+    path = root / "retry.json"
+    store, other = DataStore(path), DataStore(path)
+    calls = []
+
+    def apply(payload):
+        calls.append(1)
+        if len(calls) == 1:
+            other.upsert_cow({"cow_id": "rival", "ear_tag_id": "EA-RIVAL"})
+        payload.setdefault("cows", []).append({"cow_id": "mine", "ear_tag_id": "EA-MINE"})
+
+    store.mutate(apply)
+    assert len(calls) == 2, "a conflicting commit should re-apply the mutation"
+    assert {c["cow_id"] for c in store.load()["cows"]} == {"rival", "mine"}
+
+
+def check_lock_fallback(root):
+    path = root / "fallback.json"
+    store, other = DataStore(path, max_retries=2), DataStore(path)
+    calls = []
+
+    def apply(payload):
+        calls.append(1)
+        if len(calls) <= 2:
+            other.append_daily_log("EA-1", {"date": f"2026-02-0{len(calls)}"})
+        payload["settings"] = {"n": len(calls)}
+
+    store.mutate(apply)
+    payload = store.load()
+    assert len(calls) == 3, "after max_retries conflicts the mutation should run under the lock"
+    assert payload["settings"] == {"n": 3}
+    assert len(payload["daily_logs_by_ear_tag"]["EA-1"]) == 2
+
+
+def check_conflicts(root):
+    path = root / "conflict.json"
+    store, other = DataStore(path), DataStore(path)
+    store.upsert_cow({"cow_id": "c1", "ear_tag_id": "EA-1"})
+    revision = store.revision()
+
+    other.upsert_cow({"cow_id": "c2", "ear_tag_id": "EA-2"})
+    try:
+        store.mutate(lambda payload: None, expected_revision=revision)
+    except ConflictError:
+        pass
+    else:
+        raise AssertionError("a stale expected_revision should raise ConflictError")
+
+    revision = store.revision()
+
+    def racing(payload):
+        other.delete_cow("c2")
+
+    try:
+        store.mutate(racing, expected_revision=revision)
+    except ConflictError:
+        pass
+    else:
+        raise AssertionError("a write during an expected_revision update should raise ConflictError")
+
+    try:
+        store.upsert_cow({"cow_id": "c3", "ear_tag_id": "ea-1"})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("duplicate ear tags should be rejected")
+
+
+def check_interrupted_commit(root):
+    path = root / "crash.json"
+    store = DataStore(path)
+    store.upsert_cow({"cow_id": "c1", "ear_tag_id": "EA-1"})
+    # A writer that died after replacing the data file but before touching the
+    # lock file must not leave later writers conflicting forever.
+    store.lock_path.write_text("0")
+    revision = store.revision()
+    store.mutate(lambda payload: payload.setdefault("settings", {}), expected_revision=revision)
+    assert store.revision() == revision + 1
+
+    path.write_text('{"cows": [], "_revision": 7}')
+    assert store.revision() == 7, "files without the revision at the head should still be read"
+    store.upsert_cow({"cow_id": "c2", "ear_tag_id": "EA-2"})
+    assert store.revision() == 8
+
+
+def check_file_mode(root):
+    path = root / "mode.json"
+    store = DataStore(path)
+    store.save({"cows": []})
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask, "new files should follow the umask"
+
+    os.chmod(path, 0o640)
+    store.upsert_cow({"cow_id": "c1", "ear_tag_id": "EA-1"})
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640, "rewrites should keep the existing mode"
+    assert not [p for p in root.iterdir() if p.name.endswith(".tmp")], "temp files should not be left behind"
+
+
+def run():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        check_concurrent_writers(root)
+        check_retry_reapplies(root)
+        check_lock_fallback(root)
+        check_conflicts(root)
+        check_interrupted_commit(root)
+        check_file_mode(root)
+    print("data_store tests passed")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,293 @@
+"""Bulk signal sanity checks mirroring `src/utils/signalSanitizer.js`.
+
+Records are normalized column-by-column across a whole herd payload and the
+corrections are tallied instead of logged per field. Numeric columns go
+through NumPy array operations when it is installed, plain Python otherwise.
+Rows that need no correction are returned as they came in (records stay
+records); corrected rows are copies of the same type.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from math import floor, isfinite
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from records import updated
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+MINUTES_PER_DAY = 1440
+
+MINUTE_FIELDS = [
+    "alone_minutes_today",
+    "trough_minutes_today",
+    "lying_minutes_today",
+    "water_minutes_today",
+    "avg_meal_minutes_today",
+    "activity_minutes_today",
+    "active_minutes_today",
+]
+
+TIMESTAMP_FIELDS = ["meal_timestamps", "water_timestamps"]
+
+ACTIVITY_INDEX_MAX = 2.0
+
+# Below this many records building NumPy arrays costs more than it saves.
+NUMPY_MIN_ROWS = 32
+
+
+@dataclass
+class SanitizeCounts:
+    records: int = 0
+    ms_to_minutes: int = 0
+    seconds_to_minutes: int = 0
+    clamped_minutes: int = 0
+    clamped_timestamps: int = 0
+    dropped_timestamps: int = 0
+    clamped_activity: int = 0
+    by_field: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return sum(self.by_field.values())
+
+    def _bump(self, kind: str, name: str, n: int) -> None:
+        if n:
+            setattr(self, kind, getattr(self, kind) + n)
+            self.by_field[name] = self.by_field.get(name, 0) + n
+
+    def merge(self, other: "SanitizeCounts") -> "SanitizeCounts":
+        self.records += other.records
+        for kind in (
+            "ms_to_minutes",
+            "seconds_to_minutes",
+            "clamped_minutes",
+            "clamped_timestamps",
+            "dropped_timestamps",
+            "clamped_activity",
+        ):
+            setattr(self, kind, getattr(self, kind) + getattr(other, kind))
+        for name, n in other.by_field.items():
+            self.by_field[name] = self.by_field.get(name, 0) + n
+        return self
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        num = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return num if isfinite(num) else None
+
+
+def _float_array(values: List[Any]) -> "np.ndarray":
+    # Fast path handles numbers, numeric strings and None (-> nan) in C; mixed
+    # junk falls back to parsing element by element.
+    try:
+        arr = np.array(values, dtype=float)
+    except (TypeError, ValueError, OverflowError):
+        arr = np.array([np.nan if (v := _to_number(x)) is None else v for x in values], dtype=float)
+    arr[~np.isfinite(arr)] = np.nan
+    return arr
+
+
+def _write_back(column: List[Any], arr: "np.ndarray", missing: Any) -> List[Any]:
+    valid = ~np.isnan(arr)
+    if valid.all():
+        return arr.tolist()
+    values = arr.tolist()
+    return [v if ok else (raw if missing is _KEEP else missing) for raw, v, ok in zip(column, values, valid.tolist())]
+
+
+_KEEP = object()
+
+
+def _normalize_minute_column_np(column: List[Any], name: str, counts: SanitizeCounts) -> List[Any]:
+    v = _float_array(column)
+    with np.errstate(invalid="ignore"):
+        ms = v > 100000
+        sec = ~ms & (v > MINUTES_PER_DAY * 3)
+        v = np.where(ms, v / 60000, np.where(sec, v / 60, v))
+        clamped = (v < 0) | (v > MINUTES_PER_DAY)
+    v = np.round(np.clip(v, 0, MINUTES_PER_DAY), 2)
+
+    counts._bump("ms_to_minutes", name, int(ms.sum()))
+    counts._bump("seconds_to_minutes", name, int(sec.sum()))
+    counts._bump("clamped_minutes", name, int(clamped.sum()))
+    return _write_back(column, v, _KEEP)
+
+
+def _normalize_timestamp_column_np(column: List[Any], name: str, counts: SanitizeCounts) -> List[Any]:
+    idx = [i for i, arr in enumerate(column) if isinstance(arr, (list, tuple))]
+    out = list(column)
+    if not idx:
+        return out
+
+    lengths = np.array([len(column[i]) for i in idx])
+    flat = _float_array([v for i in idx for v in column[i]])
+    owner = np.repeat(np.arange(len(idx)), lengths)
+    keep = ~np.isnan(flat)
+    flat, owner = flat[keep], owner[keep]
+    clamped = int(((flat < 0) | (flat > MINUTES_PER_DAY)).sum())
+    minutes = np.floor(np.clip(flat, 0, MINUTES_PER_DAY) + 0.5).astype(int)
+
+    order = np.lexsort((minutes, owner))
+    minutes = minutes[order]
+    bounds = np.cumsum(np.bincount(owner, minlength=len(idx)))[:-1]
+    for i, part in zip(idx, np.split(minutes, bounds)):
+        out[i] = part.tolist()
+
+    counts._bump("clamped_timestamps", name, clamped)
+    counts._bump("dropped_timestamps", name, int((~keep).sum()))
+    return out
+
+
+def _normalize_activity_column_np(column: List[Any], counts: SanitizeCounts) -> List[Any]:
+    v = _float_array(column)
+    with np.errstate(invalid="ignore"):
+        clamped = (v < 0) | (v > ACTIVITY_INDEX_MAX)
+    v = np.round(np.clip(v, 0, ACTIVITY_INDEX_MAX), 2)
+    counts._bump("clamped_activity", "activity_index_today", int(clamped.sum()))
+    return _write_back(column, v, None)
+
+
+def _normalize_minute_column(column: List[Any], name: str, counts: SanitizeCounts) -> List[Any]:
+    parsed = [_to_number(v) for v in column]
+    ms = sec = clamped = 0
+    out: List[Any] = []
+    for raw, value in zip(column, parsed):
+        if value is None:
+            out.append(raw)
+            continue
+        if value > MINUTES_PER_DAY:
+            if value > 100000:
+                value /= 60000
+                ms += 1
+            elif value > MINUTES_PER_DAY * 3:
+                value /= 60
+                sec += 1
+        if value < 0 or value > MINUTES_PER_DAY:
+            value = max(0.0, min(float(MINUTES_PER_DAY), value))
+            clamped += 1
+        out.append(round(value, 2))
+
+    counts._bump("ms_to_minutes", name, ms)
+    counts._bump("seconds_to_minutes", name, sec)
+    counts._bump("clamped_minutes", name, clamped)
+    return out
+
+
+def _normalize_timestamp_column(column: List[Any], name: str, counts: SanitizeCounts) -> List[Any]:
+    clamped = dropped = 0
+    out: List[Any] = []
+    for arr in column:
+        if not isinstance(arr, (list, tuple)):
+            out.append(arr)
+            continue
+        parsed = [_to_number(v) for v in arr]
+        kept = [v for v in parsed if v is not None]
+        dropped += len(parsed) - len(kept)
+        clamped += sum(1 for v in kept if v < 0 or v > MINUTES_PER_DAY)
+        out.append(sorted(int(floor(max(0.0, min(float(MINUTES_PER_DAY), v)) + 0.5)) for v in kept))
+
+    counts._bump("clamped_timestamps", name, clamped)
+    counts._bump("dropped_timestamps", name, dropped)
+    return out
+
+
+def _normalize_activity_column(column: List[Any], counts: SanitizeCounts) -> List[Any]:
+    clamped = 0
+    out: List[Any] = []
+    for raw in column:
+        if raw is None:
+            out.append(None)
+            continue
+        value = _to_number(raw)
+        if value is None:
+            out.append(None)
+            continue
+        if value < 0 or value > ACTIVITY_INDEX_MAX:
+            clamped += 1
+        out.append(round(max(0.0, min(ACTIVITY_INDEX_MAX, value)), 2))
+
+    counts._bump("clamped_activity", "activity_index_today", clamped)
+    return out
+
+
+_INT_ONLY = frozenset([int])
+
+
+def _unchanged(raw: Any, value: Any) -> bool:
+    # Type-strict so that True -> 1.0 or [1.0] -> [1] still count as fixes.
+    kind = type(raw)
+    if kind is int:
+        return value == raw
+    if kind is list:
+        return raw == value and _INT_ONLY.issuperset(map(type, raw))
+    if kind is tuple:
+        return list(raw) == value and _INT_ONLY.issuperset(map(type, raw))
+    return False
+
+
+def _apply_column(rows: List[Mapping], changes: List[Optional[Dict]], name: str, fn) -> None:
+    idx = [i for i, r in enumerate(rows) if name in r]
+    if not idx:
+        return
+    column = [rows[i][name] for i in idx]
+    for i, raw, value in zip(idx, column, fn(column)):
+        if value is raw or (type(raw) is float and value == raw) or _unchanged(raw, value):
+            continue
+        if changes[i] is None:
+            changes[i] = {}
+        changes[i][name] = value
+
+
+def sanitize_records(records: List[Optional[Mapping]]) -> Tuple[List[Mapping], SanitizeCounts]:
+    counts = SanitizeCounts(records=len(records))
+    rows = [{} if r is None else r for r in records]
+    changes: List[Optional[Dict]] = [None] * len(rows)
+
+    if np is not None and len(rows) >= NUMPY_MIN_ROWS:
+        minutes, stamps, activity = _normalize_minute_column_np, _normalize_timestamp_column_np, _normalize_activity_column_np
+    else:
+        minutes, stamps, activity = _normalize_minute_column, _normalize_timestamp_column, _normalize_activity_column
+
+    for name in MINUTE_FIELDS:
+        _apply_column(rows, changes, name, lambda col, name=name: minutes(col, name, counts))
+    for name in TIMESTAMP_FIELDS:
+        _apply_column(rows, changes, name, lambda col, name=name: stamps(col, name, counts))
+    _apply_column(rows, changes, "activity_index_today", lambda col: activity(col, counts))
+
+    out = [row if fix is None else updated(row, **fix) for row, fix in zip(rows, changes)]
+    return out, counts
+
+
+def sanitize_signal_record(signal: Optional[Dict]) -> Tuple[Dict, SanitizeCounts]:
+    rows, counts = sanitize_records([signal])
+    return rows[0], counts
+
+
+def sanitize_herd_day(today_by_tag: Dict[str, Dict]) -> Tuple[Dict[str, Dict], SanitizeCounts]:
+    tags = list(today_by_tag)
+    rows, counts = sanitize_records([today_by_tag[tag] for tag in tags])
+    return dict(zip(tags, rows)), counts
+
+
+def sanitize_history(history_by_tag: Dict[str, List[Dict]]) -> Tuple[Dict[str, List[Dict]], SanitizeCounts]:
+    tags = list(history_by_tag)
+    flat: List[Dict] = []
+    bounds: List[Tuple[int, int]] = []
+    for tag in tags:
+        series = history_by_tag[tag] or []
+        bounds.append((len(flat), len(flat) + len(series)))
+        flat.extend(series)
+
+    rows, counts = sanitize_records(flat)
+    return {tag: rows[lo:hi] for tag, (lo, hi) in zip(tags, bounds)}, counts
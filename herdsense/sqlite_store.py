@@ -0,0 +1,329 @@
+"""SQLite-backed DataStore with indexed lookups.
+
+Drop-in alternative to `data_store.DataStore` (same public methods and payload
+shape) that keeps cows, task occurrences, history and daily logs in indexed
+tables so filtered queries do not need to load the whole farm. Like
+`DataStore`, mutators return only what they touched (the stored cow, the new
+task lists or None); call `load()` when the full payload is needed.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import sqlite3
+import threading
+
+from data_store import LOG_RETENTION_DAYS, DataStore, TaskUpdate
+from records import as_dict
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cows (
+    cow_id TEXT PRIMARY KEY NOT NULL,
+    ear_tag_id TEXT NOT NULL,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS cows_ear_tag ON cows (ear_tag_id);
+CREATE INDEX IF NOT EXISTS cows_active ON cows (is_active);
+
+CREATE TABLE IF NOT EXISTS task_occurrences (
+    occurrence_id TEXT PRIMARY KEY NOT NULL,
+    template_id TEXT,
+    due_date TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS occurrences_due ON task_occurrences (due_date, status);
+
+CREATE TABLE IF NOT EXISTS task_history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    occurrence_id TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_occurrence ON task_history (occurrence_id);
+
+CREATE TABLE IF NOT EXISTS daily_logs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ear_tag_id TEXT NOT NULL,
+    date TEXT,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS logs_tag_date ON daily_logs (ear_tag_id, date) WHERE date IS NOT NULL;
+CREATE INDEX IF NOT EXISTS logs_tag_seq ON daily_logs (ear_tag_id, seq);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+SELECT_COWS = "SELECT data FROM cows ORDER BY rowid"
+SELECT_COWS_BY_ACTIVE = "SELECT data FROM cows WHERE is_active = ? ORDER BY rowid"
+SELECT_COW = "SELECT data FROM cows WHERE cow_id = ?"
+SELECT_COW_BY_TAG = "SELECT data FROM cows WHERE ear_tag_id = ?"
+SELECT_TAG_OWNER = "SELECT cow_id FROM cows WHERE ear_tag_id = ?"
+UPSERT_COW = """
+INSERT INTO cows (cow_id, ear_tag_id, is_active, data) VALUES (?, ?, ?, ?)
+ON CONFLICT (cow_id) DO UPDATE SET
+    ear_tag_id = excluded.ear_tag_id, is_active = excluded.is_active, data = excluded.data
+"""
+DELETE_COW = "DELETE FROM cows WHERE cow_id = ?"
+INSERT_OCCURRENCE = "INSERT OR REPLACE INTO task_occurrences (occurrence_id, template_id, due_date, status, data) VALUES (?, ?, ?, ?, ?)"
+INSERT_HISTORY = "INSERT INTO task_history (occurrence_id, timestamp, data) VALUES (?, ?, ?)"
+INSERT_LOG = "INSERT OR REPLACE INTO daily_logs (ear_tag_id, date, data) VALUES (?, ?, ?)"
+TRIM_LOGS = """
+DELETE FROM daily_logs WHERE ear_tag_id = ? AND seq < (
+    SELECT MIN(seq) FROM (SELECT seq FROM daily_logs WHERE ear_tag_id = ? ORDER BY seq DESC LIMIT ?)
+)
+"""
+SELECT_LOGS = "SELECT ear_tag_id, data FROM daily_logs ORDER BY ear_tag_id, seq"
+SELECT_OCCURRENCES = "SELECT data FROM task_occurrences ORDER BY rowid"
+SELECT_HISTORY = "SELECT data FROM task_history ORDER BY seq"
+SELECT_META = "SELECT key, data FROM meta ORDER BY key"
+INSERT_META = "INSERT INTO meta (key, data) VALUES (?, ?)"
+
+# Payload keys with their own tables; any other top-level key (settings, ...)
+# is kept as JSON in `meta`.
+TABLE_KEYS = ("cows", "task_occurrences", "task_history", "daily_logs_by_ear_tag")
+
+
+def _tag(value: Optional[str]) -> str:
+    return (value or "").strip().upper()
+
+
+def _dump(obj: Dict[str, Any]) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"))
+
+
+@dataclass
+class SqliteDataStore:
+    path: Path
+    _conn: sqlite3.Connection = field(init=False, repr=False)
+    _lock: threading.RLock = field(init=False, repr=False, default_factory=threading.RLock)
+
+    def __post_init__(self) -> None:
+        self.path = Path(self.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.path),
+            timeout=30.0,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=128,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @contextmanager
+    def _transaction(self, mode: str = "IMMEDIATE") -> Iterator[sqlite3.Connection]:
+        # IMMEDIATE takes the write lock up front so read-check-write sequences
+        # (duplicate ear tags, merges) cannot interleave with other processes.
+        # DEFERRED is used for reads: under WAL it pins a snapshot without
+        # blocking writers.
+        with self._lock:
+            self._conn.execute(f"BEGIN {mode}")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def __enter__(self) -> "SqliteDataStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # DataStore-compatible API
+
+    def load(self) -> Dict[str, Any]:
+        with self._transaction("DEFERRED") as conn:
+            logs: Dict[str, List[Dict[str, Any]]] = {}
+            for tag, data in conn.execute(SELECT_LOGS):
+                logs.setdefault(tag, []).append(json.loads(data))
+            payload = {
+                "cows": [json.loads(d) for (d,) in conn.execute(SELECT_COWS)],
+                "task_occurrences": [json.loads(d) for (d,) in conn.execute(SELECT_OCCURRENCES)],
+                "task_history": [json.loads(d) for (d,) in conn.execute(SELECT_HISTORY)],
+                "daily_logs_by_ear_tag": logs,
+            }
+            for key, data in conn.execute(SELECT_META):
+                payload[key] = json.loads(data)
+            return payload
+
+    def save(self, payload: Dict[str, Any]) -> None:
+        cows = [as_dict(cow) for cow in payload.get("cows", [])]
+        missing = sum(1 for cow in cows if not cow.get("cow_id"))
+        if missing:
+            raise ValueError(f"cow_id is required for every cow ({missing} missing)")
+
+        with self._transaction() as conn:
+            for table in ("cows", "task_occurrences", "task_history", "daily_logs", "meta"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.executemany(INSERT_META, ((k, _dump(v)) for k, v in payload.items() if k not in TABLE_KEYS))
+            for cow in cows:
+                self._write_cow(conn, cow)
+            self._write_occurrences(conn, payload.get("task_occurrences", []))
+            self._write_history(conn, payload.get("task_history", []))
+            self._append_logs(
+                conn,
+                ((tag, row) for tag, rows in payload.get("daily_logs_by_ear_tag", {}).items() for row in rows),
+            )
+
+    def upsert_cow(self, cow: Dict[str, Any]) -> Dict[str, Any]:
+        cow = as_dict(cow)
+        ear = _tag(cow.get("ear_tag_id"))
+        if not ear:
+            raise ValueError("ear_tag_id is required")
+        if not cow.get("cow_id"):
+            raise ValueError("cow_id is required")
+
+        with self._transaction() as conn:
+            owner = conn.execute(SELECT_TAG_OWNER, (ear,)).fetchone()
+            if owner and owner[0] != cow["cow_id"]:
+                raise ValueError(f"Duplicate ear_tag_id: {ear}")
+            existing = conn.execute(SELECT_COW, (cow["cow_id"],)).fetchone()
+            merged = {**json.loads(existing[0]), **cow} if existing else cow
+            self._write_cow(conn, merged)
+        return merged
+
+    def delete_cow(self, cow_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute(DELETE_COW, (cow_id,))
+
+    def archive_cow(self, cow_id: str, inactive: bool = True) -> Optional[Dict[str, Any]]:
+        with self._transaction() as conn:
+            existing = conn.execute(SELECT_COW, (cow_id,)).fetchone()
+            if not existing:
+                return None
+            cow = {**json.loads(existing[0]), "is_active": not inactive}
+            self._write_cow(conn, cow)
+        return cow
+
+    def append_daily_log(self, ear_tag_id: str, day_log: Dict[str, Any]) -> None:
+        self.append_daily_logs([(ear_tag_id, day_log)])
+
+    def append_daily_logs(self, entries: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        with self._transaction() as conn:
+            self._append_logs(conn, entries)
+
+    def update_tasks(self, fn: TaskUpdate) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        # Only the task tables are read and rewritten, inside one IMMEDIATE
+        # transaction, so concurrent log or cow writes are never overwritten.
+        with self._transaction() as conn:
+            occurrences = [json.loads(d) for (d,) in conn.execute(SELECT_OCCURRENCES)]
+            history = [json.loads(d) for (d,) in conn.execute(SELECT_HISTORY)]
+            next_occurrences, next_history = fn(occurrences, history)
+            next_occurrences = [as_dict(o) for o in next_occurrences]
+            next_history = [as_dict(h) for h in next_history]
+
+            conn.execute("DELETE FROM task_occurrences")
+            self._write_occurrences(conn, next_occurrences)
+            if next_history[: len(history)] == history:
+                self._write_history(conn, next_history[len(history) :])
+            else:
+                conn.execute("DELETE FROM task_history")
+                self._write_history(conn, next_history)
+        return next_occurrences, next_history
+
+    # Indexed queries
+
+    def active_cows(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [json.loads(d) for (d,) in self._conn.execute(SELECT_COWS_BY_ACTIVE, (1,))]
+
+    def archived_cows(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [json.loads(d) for (d,) in self._conn.execute(SELECT_COWS_BY_ACTIVE, (0,))]
+
+    def cow_by_ear_tag(self, ear_tag_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(SELECT_COW_BY_TAG, (_tag(ear_tag_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def logs_for_tags(
+        self,
+        ear_tag_ids: Iterable[str],
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        tags = sorted({_tag(t) for t in ear_tag_ids})
+        if not tags:
+            return {}
+        sql = f"SELECT ear_tag_id, data FROM daily_logs WHERE ear_tag_id IN ({','.join('?' * len(tags))})"
+        params: List[Any] = list(tags)
+        if since is not None:
+            sql += " AND date >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND date <= ?"
+            params.append(until)
+        sql += " ORDER BY ear_tag_id, seq"
+
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            for tag, data in self._conn.execute(sql, params):
+                out.setdefault(tag, []).append(json.loads(data))
+        return out
+
+    # Internals
+
+    @staticmethod
+    def _write_cow(conn: sqlite3.Connection, cow: Dict[str, Any]) -> None:
+        try:
+            conn.execute(
+                UPSERT_COW,
+                (cow["cow_id"], _tag(cow.get("ear_tag_id")), 0 if cow.get("is_active") is False else 1, _dump(cow)),
+            )
+        except sqlite3.IntegrityError as exc:
+            if "cows.ear_tag_id" not in str(exc):
+                raise
+            raise ValueError(f"Duplicate ear_tag_id: {_tag(cow.get('ear_tag_id'))}") from exc
+
+    @staticmethod
+    def _write_occurrences(conn: sqlite3.Connection, occurrences: Iterable[Dict[str, Any]]) -> None:
+        conn.executemany(
+            INSERT_OCCURRENCE,
+            (
+                (o.get("occurrence_id"), o.get("template_id"), o.get("due_date"), o.get("status"), _dump(as_dict(o)))
+                for o in occurrences
+            ),
+        )
+
+    @staticmethod
+    def _write_history(conn: sqlite3.Connection, history: Iterable[Dict[str, Any]]) -> None:
+        conn.executemany(
+            INSERT_HISTORY,
+            ((h.get("occurrence_id"), h.get("timestamp"), _dump(as_dict(h))) for h in history),
+        )
+
+    @staticmethod
+    def _append_logs(conn: sqlite3.Connection, entries: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        touched = set()
+        rows = []
+        for ear_tag_id, day_log in entries:
+            key = _tag(ear_tag_id)
+            day_log = as_dict(day_log)
+            rows.append((key, day_log.get("date"), _dump(day_log)))
+            touched.add(key)
+        conn.executemany(INSERT_LOG, rows)
+        conn.executemany(TRIM_LOGS, ((key, key, LOG_RETENTION_DAYS) for key in touched))
+
+
+def migrate_json_store(json_path: Path, sqlite_path: Path) -> SqliteDataStore:
+    """Copy a JSON DataStore file into a new (or emptied) SQLite store."""
+    payload = DataStore(Path(json_path)).load()
+    store = SqliteDataStore(Path(sqlite_path))
+    store.save(payload)
+    return store
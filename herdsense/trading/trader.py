@@ -1,35 +1,117 @@
 from datamodel import OrderDepth, TradingState, Order
-from typing import Dict, List
+from collections import deque
+from time import perf_counter_ns
+from typing import Dict, List, Optional, Tuple
+import csv
 import json
 
 
+class TickTracer:
+    """Bounded ring of per-product tick records for offline latency/tuning analysis."""
+
+    STAGES = ("load_ns", "fair_value_ns", "take_ns", "make_ns", "serialize_ns")
+    TERMS = ("anchor", "short_mean_term", "long_mean_term", "micro_term", "imbalance_term", "mom1_term", "mom2_term")
+    COLUMNS = ("timestamp", "product", "position") + STAGES + ("fair_value",) + TERMS + ("take_orders", "make_orders")
+
+    def __init__(self, capacity: int = 2048):
+        self.rows = deque(maxlen=capacity)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def new_row(self, timestamp: int, product: str, position: int, load_ns: int) -> Dict:
+        row = dict.fromkeys(self.COLUMNS)
+        row.update(timestamp=timestamp, product=product, position=position, load_ns=load_ns)
+        return row
+
+    def commit(self, rows: List[Dict], serialize_ns: int) -> None:
+        for row in rows:
+            row["serialize_ns"] = serialize_ns
+            self.rows.append(tuple(row[c] for c in self.COLUMNS))
+
+    def clear(self) -> None:
+        self.rows.clear()
+
+    def to_csv(self, path: str) -> int:
+        with open(path, "w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(self.COLUMNS)
+            for row in self.rows:
+                writer.writerow(["" if v is None else f"{v:.10g}" if isinstance(v, float) else v for v in row])
+        return len(self.rows)
+
+    def to_parquet(self, path: str) -> int:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("to_parquet requires pyarrow; use to_csv instead") from exc
+
+        columns = list(zip(*self.rows)) if self.rows else [()] * len(self.COLUMNS)
+        table = pa.table({name: list(values) for name, values in zip(self.COLUMNS, columns)})
+        pq.write_table(table, path)
+        return len(self.rows)
+
+
 class Trader:
     POSITION_LIMITS = {
         "EMERALDS": 20,
         "TOMATOES": 20,
     }
 
+    PARAMS = {
+        "EMERALDS": {
+            "take_threshold": 0.8249847899053748,
+            "base_half_spread": 3,
+            "inventory_skew": 0.11650582963402509,
+            "base_size": 7,
+        },
+        "TOMATOES": {
+            "take_threshold": 1.0538608108667,
+            "base_half_spread": 3,
+            "inventory_skew": 0.086677641005485,
+            "base_size": 5,
+        },
+    }
+
+    def __init__(self, trace: bool = False, trace_capacity: int = 2048):
+        self.tracer: Optional[TickTracer] = TickTracer(trace_capacity) if trace else None
+
     def run(self, state: TradingState):
+        tracer = self.tracer
+        t0 = perf_counter_ns() if tracer is not None else 0
+
         result: Dict[str, List[Order]] = {}
         memory = self.load_memory(state.traderData)
 
+        load_ns = perf_counter_ns() - t0 if tracer is not None else 0
+        traces: List[Dict] = []
+
         for product in state.order_depths:
             if product not in self.POSITION_LIMITS:
                 continue
 
             order_depth = state.order_depths[product]
             position = state.position.get(product, 0)
+            trace = None
+            if tracer is not None:
+                trace = tracer.new_row(state.timestamp, product, position, load_ns)
+                traces.append(trace)
 
             if product == "EMERALDS":
-                orders = self.trade_emeralds(order_depth, position)
+                orders = self.trade_emeralds(order_depth, position, trace)
             elif product == "TOMATOES":
-                orders = self.trade_tomatoes(order_depth, position, memory)
+                orders = self.trade_tomatoes(order_depth, position, memory, trace)
             else:
                 orders = []
 
             result[product] = orders
 
+        t1 = perf_counter_ns() if tracer is not None else 0
         trader_data = json.dumps(memory)
+        if tracer is not None:
+            tracer.commit(traces, perf_counter_ns() - t1)
+
         conversions = 0
         return result, conversions, trader_data
 
@@ -161,47 +243,25 @@ class Trader:
 
         return orders
 
-    def trade_emeralds(self, order_depth: OrderDepth, position: int) -> List[Order]:
+    def emeralds_fair_value(self, order_depth: OrderDepth) -> Optional[Tuple[float, Dict[str, float]]]:
         mid = self.get_mid_price(order_depth)
         if mid is None:
-            return []
+            return None
         micro = self.get_microprice(order_depth)
         imbalance = self.get_imbalance(order_depth)
-        fair_value = (
-            10000.0
-            - 0.19914599256306142 * (micro - mid)
-            + 0.2830318695336046 * imbalance
-        )
 
-        orders: List[Order] = []
-        orders += self.take_liquidity(
-            product="EMERALDS",
-            order_depth=order_depth,
-            fair_value=fair_value,
-            position=position,
-            take_threshold=0.8249847899053748,
-        )
-
-        net_after = position + sum(o.quantity for o in orders)
-
-        orders += self.make_market(
-            product="EMERALDS",
-            order_depth=order_depth,
-            fair_value=fair_value,
-            position=net_after,
-            base_half_spread=3,
-            inventory_skew=0.11650582963402509,
-            base_size=7,
-        )
-
-        return orders
-
-    def trade_tomatoes(self, order_depth: OrderDepth, position: int, memory) -> List[Order]:
-        orders: List[Order] = []
+        terms = {
+            "anchor": 10000.0,
+            "micro_term": -0.19914599256306142 * (micro - mid),
+            "imbalance_term": 0.2830318695336046 * imbalance,
+        }
+        fair_value = terms["anchor"] + terms["micro_term"] + terms["imbalance_term"]
+        return fair_value, terms
 
+    def tomatoes_fair_value(self, order_depth: OrderDepth, memory) -> Optional[Tuple[float, Dict[str, float]]]:
         mid = self.get_mid_price(order_depth)
         if mid is None:
-            return orders
+            return None
 
         micro = self.get_microprice(order_depth)
         imbalance = self.get_imbalance(order_depth)
@@ -220,33 +280,82 @@ class Trader:
         mom1 = mid - last_mid
         mom2 = last_mid - prev_mid
 
+        terms = {
+            "short_mean_term": 0.4027408551408521 * short_mean,
+            "long_mean_term": 0.5972591448591479 * long_mean,
+            "micro_term": 0.7199377953272201 * (micro - mid),
+            "imbalance_term": 0.9122593492936208 * imbalance,
+            "mom1_term": -0.42064762831274155 * mom1,
+            "mom2_term": -0.3172550293009319 * mom2,
+        }
         fair_value = (
-            0.4027408551408521 * short_mean
-            + 0.5972591448591479 * long_mean
-            + 0.7199377953272201 * (micro - mid)
-            + 0.9122593492936208 * imbalance
-            - 0.42064762831274155 * mom1
-            - 0.3172550293009319 * mom2
+            terms["short_mean_term"]
+            + terms["long_mean_term"]
+            + terms["micro_term"]
+            + terms["imbalance_term"]
+            + terms["mom1_term"]
+            + terms["mom2_term"]
         )
+        return fair_value, terms
 
+    def trade_product(
+        self,
+        product: str,
+        order_depth: OrderDepth,
+        position: int,
+        fair: Optional[Tuple[float, Dict[str, float]]],
+        trace: Optional[Dict] = None,
+        started_ns: int = 0,
+    ) -> List[Order]:
+        if trace is not None:
+            t_fair = perf_counter_ns()
+            trace["fair_value_ns"] = t_fair - started_ns
+        if fair is None:
+            return []
+
+        fair_value, terms = fair
+        params = self.PARAMS[product]
+
+        orders: List[Order] = []
         orders += self.take_liquidity(
-            product="TOMATOES",
+            product=product,
             order_depth=order_depth,
             fair_value=fair_value,
             position=position,
-            take_threshold=1.0538608108667,
+            take_threshold=params["take_threshold"],
         )
+        take_count = len(orders)
+        if trace is not None:
+            t_take = perf_counter_ns()
+            trace["take_ns"] = t_take - t_fair
 
         net_after = position + sum(o.quantity for o in orders)
 
         orders += self.make_market(
-            product="TOMATOES",
+            product=product,
             order_depth=order_depth,
             fair_value=fair_value,
             position=net_after,
-            base_half_spread=3,
-            inventory_skew=0.086677641005485,
-            base_size=5,
+            base_half_spread=params["base_half_spread"],
+            inventory_skew=params["inventory_skew"],
+            base_size=params["base_size"],
         )
 
+        if trace is not None:
+            trace["make_ns"] = perf_counter_ns() - t_take
+            trace["fair_value"] = fair_value
+            trace.update(terms)
+            trace["take_orders"] = take_count
+            trace["make_orders"] = len(orders) - take_count
+
         return orders
+
+    def trade_emeralds(self, order_depth: OrderDepth, position: int, trace: Optional[Dict] = None) -> List[Order]:
+        started_ns = perf_counter_ns() if trace is not None else 0
+        fair = self.emeralds_fair_value(order_depth)
+        return self.trade_product("EMERALDS", order_depth, position, fair, trace, started_ns)
+
+    def trade_tomatoes(self, order_depth: OrderDepth, position: int, memory, trace: Optional[Dict] = None) -> List[Order]:
+        started_ns = perf_counter_ns() if trace is not None else 0
+        fair = self.tomatoes_fair_value(order_depth, memory)
+        return self.trade_product("TOMATOES", order_depth, position, fair, trace, started_ns)